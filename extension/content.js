@@ -255,6 +255,36 @@ function hideExplanationPopup() {
   popup.style.display = 'none';
 }
 
+// Read a server-sent event stream, calling onEvent(event, data) for every event
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) {
+          event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          data += line.slice(5).trim();
+        }
+      }
+      onEvent(event, data ? JSON.parse(data) : {});
+    }
+  }
+}
+
 async function getExplanation(text) {
   try {
     console.log('Getting explanation for text:', text);
@@ -270,7 +300,7 @@ async function getExplanation(text) {
     }
 
     console.log('Making API request for text:', text);
-    const response = await fetch('http://localhost:8000/explain', {
+    const response = await fetch('http://localhost:8000/explain/stream', {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -286,13 +316,27 @@ async function getExplanation(text) {
     });
 
     console.log('API Response status:', response.status);
-    const data = await response.json();
-    console.log('API Response data:', JSON.stringify(data, null, 2));
-    
     if (!response.ok) {
-      throw new Error(`API Error: ${data.error?.message || response.statusText}`);
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(`API Error: ${errorData.detail || response.statusText}`);
     }
 
+    // Show the explanation while it is generated, then render the complete one
+    const loading = popup.querySelector('.loading');
+    let streamedText = '';
+    const data = {};
+    await readEventStream(response, (event, payload) => {
+      if (event === 'token') {
+        streamedText += payload.text;
+        if (loading) loading.textContent = streamedText;
+      } else if (event === 'done') {
+        data.explanation = payload.explanation;
+      } else if (event === 'error') {
+        throw new Error(payload.detail);
+      }
+    });
+    console.log('API Response data:', JSON.stringify(data, null, 2));
+
     if (!data.explanation) {
       throw new Error('No explanation received from API');
     }
@@ -516,7 +560,7 @@ async function getBotResponse(question) {
       title: title
     });
 
-    const response = await fetch('http://localhost:8000/query', {
+    const response = await fetch('http://localhost:8000/query/stream', {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -533,15 +577,36 @@ async function getBotResponse(question) {
     });
 
     console.log('API Response status:', response.status);
-    const data = await response.json();
-    console.log('API Response data:', JSON.stringify(data, null, 2));
-    
     if (!response.ok) {
-      throw new Error(`API Error: ${data.error?.message || response.statusText}`);
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(`API Error: ${errorData.detail || response.statusText}`);
     }
 
-    // Remove "Thinking..." message
+    // Show progress and the answer as it is generated in the "Thinking..." message
     const messagesDiv = qaPopup.querySelector('.qa-messages');
+    const thinkingMessage = messagesDiv.lastChild;
+    let streamedText = '';
+    const data = {};
+    await readEventStream(response, (event, payload) => {
+      if (event === 'retrieval') {
+        thinkingMessage.textContent = 'Reading the relevant parts of the paper...';
+      } else if (event === 'tool') {
+        thinkingMessage.textContent = `Using ${payload.name}...`;
+      } else if (event === 'progress') {
+        thinkingMessage.textContent = `Summarizing (${payload.answered}/${payload.total})...`;
+      } else if (event === 'token') {
+        streamedText += payload.text;
+        thinkingMessage.textContent = streamedText;
+        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+      } else if (event === 'done') {
+        data.answer = payload.answer;
+      } else if (event === 'error') {
+        throw new Error(payload.detail);
+      }
+    });
+    console.log('API Response data:', JSON.stringify(data, null, 2));
+
+    // Remove "Thinking..." message
     messagesDiv.removeChild(messagesDiv.lastChild);
     
     // Add the response to the chat using the 'answer' key
@@ -1,12 +1,80 @@
 from langchain_groq import ChatGroq
 from langchain.agents import initialize_agent, Tool
-from langchain_community.tools.arxiv.tool import ArxivQueryRun
-from typing import Dict, Any
+from langchain_core.callbacks import BaseCallbackHandler
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from contextvars import ContextVar
+from dataclasses import dataclass
+import threading
+import time
 
 from retriever import PineconeRetriever
+from router import QueryRouter, RouteStats, is_paper_summary_request, mentions_summary, ROUTE_AGENT, ROUTE_DIRECT, ROUTE_RECOMMEND, ROUTE_SUMMARY
+from summary_store import SummaryStore, DEFAULT_SUMMARY_LEVEL
+from recommendation_cache import RecommendationCache
+
+# Fixed questions answered for every structured summary
+SUMMARY_QUESTIONS = [
+    "What is the main topic or subject of this text?",
+    "What are the key experiments or methods described?",
+    "What are the main findings or results?",
+    "How was the work evaluated or validated?",
+    "What are the key conclusions or implications?"
+]
+
+
+@dataclass
+class RequestContext:
+    url: str
+    title: Optional[str]
+    level: Optional[str]
+
+
+# Paper the current request is about, read by the tools of the shared agent executors
+_request_context: ContextVar[Optional[RequestContext]] = ContextVar("paperly_request_context", default=None)
+
+
+# Receives progress events, e.g. ("retrieval", {...}), ("tool", {...}) or ("token", {"text": ...})
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class _ToolEventHandler(BaseCallbackHandler):
+    """
+    Forwards the tool calls of the agent as progress events.
+    """
+
+    def __init__(self, on_event: EventCallback):
+        self.on_event = on_event
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        self.on_event("tool", {"name": (serialized or {}).get("name"), "input": input_str})
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        self.on_event("tool_end", {})
+
 
 class ResearchAgent:
-    def __init__(self, groq_key: str, embeddings, retriever: PineconeRetriever, pinecone_index_name: str = 'paperly'):
+    """
+    Research assistant answering questions about one paper at a time.
+    An instance is reused across requests: the LLM client and the agent executors
+    are built once, and the paper of each request is bound through a ContextVar.
+    """
+
+    def __init__(
+        self,
+        groq_key: str,
+        embeddings,
+        retriever: PineconeRetriever,
+        pinecone_index_name: str = 'paperly',
+        llm=None,
+        summary_concurrency: int = 5,
+        llm_timeout: float = 30.0,
+        summary_timeout: Optional[float] = None,
+        summary_store: Optional[SummaryStore] = None,
+        fast_path: bool = True,
+        route_stats: Optional[RouteStats] = None,
+        recommendation_cache: Optional[RecommendationCache] = None,
+    ):
         """
         Initialize the Research Agent with necessary API keys and configurations.
         
@@ -14,18 +82,50 @@ class ResearchAgent:
             retriever (PineconeRetriever): Retriever for Pinecone
             groq_key (str): API key for Groq
             pinecone_index_name (str): Name of the Pinecone index to use
+            llm: Chat model to use instead of a new ChatGroq client
+            summary_concurrency (int): Maximum summary questions answered concurrently, across the agent's summaries
+            llm_timeout (float): Timeout in seconds of each LLM call
+            summary_timeout (Optional[float]): Deadline in seconds of all summary questions, twice llm_timeout if None
+            summary_store (Optional[SummaryStore]): Store of precomputed summaries served to summary requests
+            fast_path (bool): Answer summary, recommendation and plain questions without the agent loop
+            route_stats (Optional[RouteStats]): Counters of the routes taken, shared between agents
+            recommendation_cache (Optional[RecommendationCache]): Cache of arXiv recommendations by title, shared between agents
         """
         self.pinecone_index_name = pinecone_index_name
-        self.retriever = PineconeRetriever(embeddings=embeddings, index_name=self.pinecone_index_name)
+        self.retriever = retriever
+        self.summary_concurrency = summary_concurrency
+        self.llm_timeout = llm_timeout
+        self.summary_timeout = summary_timeout or 2 * llm_timeout
+        # Summary questions of every request served by this agent share one bounded pool
+        self._summary_pool = ThreadPoolExecutor(max_workers=summary_concurrency, thread_name_prefix="paperly-summary")
+        self.summary_store = summary_store
+        self.fast_path = fast_path
+        self.router = QueryRouter()
+        self.route_stats = route_stats or RouteStats()
+        self.recommendation_cache = recommendation_cache
+        # Agent executors by whether the summary tool is included, built on first use
+        self._agents: Dict[bool, Any] = {}
+        self._agents_lock = threading.Lock()
         
         # Initialize LLM
-        self.llm = ChatGroq(
+        self.llm = llm or ChatGroq(
             groq_api_key=groq_key,
-            model_name="llama3-8b-8192"
+            model_name="llama3-8b-8192",
+            request_timeout=llm_timeout
         )
         
-        # Initialize arXiv tool
-        self.arxiv = ArxivQueryRun()
+        # arXiv tool, built on first use and only when no recommendation cache is shared
+        self._arxiv = None
+        self._arxiv_lock = threading.Lock()
+
+    @property
+    def arxiv(self):
+        with self._arxiv_lock:
+            if self._arxiv is None:
+                from langchain_community.tools.arxiv.tool import ArxivQueryRun
+
+                self._arxiv = ArxivQueryRun()
+            return self._arxiv
 
 
     def pinecone_retriever_fn(self, query: str, url: str) -> str:
@@ -37,51 +137,93 @@ class ResearchAgent:
             url (str): The URL to filter results by. This is required to ensure we only get results from the correct document.
         """
         try:
-            
-            concatenated_text = self.retriever.get_relevant_documents(query, url, 7)
-            return concatenated_text if concatenated_text else "No relevant documents found."
+            context = self.retriever.get_context(query, url, 7)
+            return context.text if context else "No relevant documents found."
         except Exception as e:
             return f"Error retrieving documents: {str(e)}"
 
-    def structured_summary_fn(self, text: str, url: str) -> str:
+    def structured_summary_fn(self, text: str, url: str, on_event: Optional[EventCallback] = None) -> str:
         """
         Generate a structured summary based on specific questions about the text.
+        A summary precomputed for the paper is returned without any retrieval or LLM call.
         """
-        try:
-            # Define the questions for the summary
-            questions = [
-                "What is the main topic or subject of this text?",
-                "What are the key experiments or methods described?",
-                "What are the main findings or results?",
-                "How was the work evaluated or validated?",
-                "What are the key conclusions or implications?"
-            ]
-            
-            answers = []
+        if self.summary_store is not None:
+            summary = self.summary_store.get(url)
+            if summary is not None:
+                return summary
 
-            # Process each question separately
-            for question in questions:
-                query = f"{text}\n{question}"
-                context = self.retriever.get_relevant_documents(query, url, 5)
-                
-                if not context:
-                    answers.append(f"Question: {question}\nAnswer: No relevant documents found.")
-                    continue
-                    
-                prompt = f"""Based on the following text and retrieved documents, please answer this specific question in 2-3 sentences:
+        summary, _ = self.generate_structured_summary(text, url, on_event)
+        if self.summary_store is not None and not summary.startswith("Error generating summary"):
+            self.summary_store.put(url, summary)
+        return summary
 
-Question: {question}
+    def precompute_summaries(self, url: str, title: str, levels: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Generate the structured summary of an indexed paper and its per-level variants, and store them.
+        
+        Args:
+            url (str): The URL of the paper
+            title (str): The title of the paper, used as the text the summary questions are asked about
+            levels (Optional[List[str]]): Reader levels, e.g. "beginner", rewritten from the structured summary
+            
+        Returns:
+            Dict[str, str]: The generated summaries by level
+        """
+        summary, _ = self.generate_structured_summary(title or url, url)
+        if summary.startswith("Error generating summary"):
+            raise Exception(summary)
+        summaries = {DEFAULT_SUMMARY_LEVEL: summary}
 
-Original Text:
-{text}
+        for level in levels or []:
+            prompt = f"""Rewrite the following research paper summary for a reader at the {level} level.
+Keep every key point, adapt the vocabulary and the amount of background explanation to the reader, and stay under 300 words.
 
-Retrieved Documents:
-{context}
+Summary:
+{summary}
 
-Provide a concise and focused answer that directly addresses the question."""
+Rewritten summary:"""
+            summaries[level] = self.llm.invoke(prompt).content
 
-                response = self.llm.invoke(prompt)
-                answers.append(f"Question: {question}\nAnswer: {response.content}")
+        if self.summary_store is not None:
+            for level, text in summaries.items():
+                self.summary_store.put(url, text, level)
+        return summaries
+
+    def generate_structured_summary(self, text: str, url: str, on_event: Optional[EventCallback] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Answer the summary questions concurrently, then merge the answers with one synthesis call.
+        With on_event, answered questions are reported and the synthesis is streamed token by token.
+        Returns the summary and its timings, empty if the summary failed.
+        """
+        try:
+            start = time.perf_counter()
+            # One deadline for the whole fan-out, however many rounds summary_concurrency takes
+            deadline = time.monotonic() + self.summary_timeout
+            futures = {
+                self._summary_pool.submit(self._answer_summary_question, text, url, question, deadline): i
+                for i, question in enumerate(SUMMARY_QUESTIONS)
+            }
+            answers: List[Optional[str]] = [None] * len(SUMMARY_QUESTIONS)
+            question_timings: List[Optional[Dict[str, Any]]] = [None] * len(SUMMARY_QUESTIONS)
+            answered = 0
+            try:
+                for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+                    i = futures[future]
+                    answers[i], question_timings[i] = future.result()
+                    answered += 1
+                    if on_event is not None:
+                        on_event("progress", {"question": SUMMARY_QUESTIONS[i], "answered": answered, "total": len(SUMMARY_QUESTIONS)})
+            except FutureTimeoutError:
+                pass
+            finally:
+                # Questions still queued are dropped, running ones stop before their LLM call
+                for future in futures:
+                    future.cancel()
+            for i, question in enumerate(SUMMARY_QUESTIONS):
+                if answers[i] is None:
+                    answers[i] = f"Question: {question}\nAnswer: Timed out."
+                    question_timings[i] = {"question": question, "timed_out": True}
+            fan_out_seconds = time.perf_counter() - start
                 
             final_prompt = f"""Based on the following answers to specific questions, create a coherent and detailed summary in less than 300 words total.
 Maintain the structure of addressing each question but make it flow naturally as a single summary.
@@ -90,11 +232,62 @@ Maintain the structure of addressing each question but make it flow naturally as
 
 Create a well-structured summary that flows naturally while addressing all the questions."""
 
-            final_response = self.llm.invoke(final_prompt)
-            return final_response.content
+            synthesis_start = time.perf_counter()
+            final_response = self.generate(final_prompt, on_event)
+            synthesis_seconds = time.perf_counter() - synthesis_start
+
+            timings = {
+                "questions": question_timings,
+                "fan_out_seconds": fan_out_seconds,
+                "synthesis_seconds": synthesis_seconds,
+                "total_seconds": time.perf_counter() - start,
+            }
+            print(f"Summary timings: fan-out {fan_out_seconds:.2f}s, synthesis {synthesis_seconds:.2f}s")
+            return final_response, timings
             
         except Exception as e:
-            return f"Error generating summary: {str(e)}"
+            return f"Error generating summary: {str(e)}", {}
+
+    def _answer_summary_question(self, text: str, url: str, question: str, deadline: Optional[float] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Retrieve context for one summary question and answer it in 2-3 sentences.
+        Past the time.monotonic() deadline the question is answered as timed out without an LLM call.
+        
+        Returns:
+            Tuple[str, Dict[str, Any]]: The formatted answer and its retrieval/generation timings
+        """
+        timing = {"question": question}
+        query = f"{text}\n{question}"
+        timed_out = f"Question: {question}\nAnswer: Timed out."
+        if deadline is not None and time.monotonic() >= deadline:
+            return timed_out, {**timing, "timed_out": True}
+
+        retrieval_start = time.perf_counter()
+        context = self.retriever.get_context(query, url, 5)
+        timing["retrieval_seconds"] = time.perf_counter() - retrieval_start
+        timing["context_tokens"] = context.tokens
+        
+        if not context:
+            return f"Question: {question}\nAnswer: No relevant documents found.", timing
+        if deadline is not None and time.monotonic() >= deadline:
+            return timed_out, {**timing, "timed_out": True}
+            
+        prompt = f"""Based on the following text and retrieved documents, please answer this specific question in 2-3 sentences:
+
+Question: {question}
+
+Original Text:
+{text}
+
+Retrieved Documents:
+{context.text}
+
+Provide a concise and focused answer that directly addresses the question."""
+
+        generation_start = time.perf_counter()
+        response = self.llm.invoke(prompt)
+        timing["generation_seconds"] = time.perf_counter() - generation_start
+        return f"Question: {question}\nAnswer: {response.content}", timing
 
     def _is_summary_request(self, query: str) -> bool:
         """
@@ -106,15 +299,7 @@ Create a well-structured summary that flows naturally while addressing all the q
         Returns:
             bool: True if the query is requesting a summary, False otherwise
         """
-        summary_keywords = [
-            "summarize", "summary", "summarise", "overview", "comprehensive report",
-            "give me a summary", "can you summarize", "what is this paper about",
-            "main points", "key findings", "conclusion", "synopsis",
-            "brief overview", "main ideas", "core concepts", "central themes"
-        ]
-        
-        query_lower = query.lower()
-        return any(keyword in query_lower for keyword in summary_keywords)
+        return mentions_summary(query)
 
     def process_question(self, query: str, url: str, title: str, level: str) -> str:
         """
@@ -127,11 +312,116 @@ Create a well-structured summary that flows naturally while addressing all the q
         Returns:
             str: The answer generated by the agent
         """
+        return self.answer_question(query, url, title, level)[0]
+
+    def answer_question(
+        self, query: str, url: str, title: str, level: str, on_event: Optional[EventCallback] = None
+    ) -> Tuple[str, str]:
+        """
+        Answer a question on the cheapest route that can handle it.
+        Summaries and recommendations call their tool directly, plain questions about the paper
+        use one retrieval and one generation, and the rest goes through the ReAct agent.
+        
+        Args:
+            query (str): The user's question about the paper
+            url (str): The URL of the paper
+            title (str): The title of the paper
+            level (str): Reader level of the answer
+            on_event (Optional[EventCallback]): Receives retrieval, tool and progress events and the answer tokens
+            
+        Returns:
+            Tuple[str, str]: The answer and the route it took
+        """
+        route = self.router.route(query) if self.fast_path else ROUTE_AGENT
+        start = time.perf_counter()
         try:
-            # Initialize agent with the current query and URL
-            self.agent_config = self._initialize_agent_tools(url, query, title)
-            self.agent = self.agent_config["agent"]
-            self.tools = self.agent_config["tools"]
+            if on_event is not None:
+                on_event("route", {"route": route})
+            if route == ROUTE_SUMMARY:
+                answer = self._answer_summary(query, url, title, level, on_event)
+            elif route == ROUTE_RECOMMEND:
+                if on_event is not None:
+                    on_event("tool", {"name": "Paper Recommender", "input": title})
+                answer = self.recommend_papers_fn(title)
+                self._emit_answer(answer, on_event)
+            elif route == ROUTE_DIRECT:
+                answer = self._answer_directly(query, url, level, on_event)
+            else:
+                answer = self._run_agent(query, url, title, level, on_event)
+                self._emit_answer(answer, on_event)
+        except Exception as e:
+            answer = f"Error processing question: {str(e)}"
+
+        seconds = time.perf_counter() - start
+        self.route_stats.record(route, seconds)
+        print(f"Answered on the {route} route in {seconds:.2f}s")
+        return answer, route
+
+    def generate(self, prompt: str, on_event: Optional[EventCallback] = None) -> str:
+        """
+        Run one LLM call, streaming the answer as token events when on_event is given.
+        """
+        if on_event is None:
+            return self.llm.invoke(prompt).content
+
+        tokens = []
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                tokens.append(chunk.content)
+                on_event("token", {"text": chunk.content})
+        return "".join(tokens)
+
+    def _emit_answer(self, answer: str, on_event: Optional[EventCallback]) -> None:
+        # Answers that were not generated token by token are sent as a single token
+        if on_event is not None:
+            on_event("token", {"text": answer})
+
+    def _answer_summary(self, query: str, url: str, title: str, level: str, on_event: Optional[EventCallback] = None) -> str:
+        if on_event is not None:
+            on_event("tool", {"name": "Paper Summary Generator", "input": title or query})
+        if self.summary_store is not None:
+            summary = self.summary_store.get(url, level)
+            if summary is not None:
+                self._emit_answer(summary, on_event)
+                return summary
+        return self.structured_summary_fn(title or query, url, on_event)
+
+    def _answer_directly(self, query: str, url: str, level: str, on_event: Optional[EventCallback] = None) -> str:
+        """
+        Answer a question about the paper with a single retrieval and generation.
+        """
+        context = self.retriever.get_context(query, url, 7)
+        if on_event is not None:
+            on_event("retrieval", {"documents": len(context.chunks), "tokens": context.tokens})
+        if not context:
+            answer = "I could not find anything in the paper related to this question."
+            self._emit_answer(answer, on_event)
+            return answer
+        prompt = f"""You are a research assistant. Answer the question about the research paper using the excerpts below.
+Adapt the depth and vocabulary of the answer to a {level or "general"} reader. If the excerpts do not contain the answer, say so.
+
+Question: {query}
+
+Excerpts from the paper:
+{context.text}
+
+Answer:"""
+        return self.generate(prompt, on_event)
+
+    def _run_agent(self, query: str, url: str, title: str, level: str, on_event: Optional[EventCallback] = None) -> str:
+        """
+        Answer a question with the ReAct agent and its tools.
+        """
+        try:
+            # Summary requests for papers with a precomputed summary are answered from the store
+            if self.summary_store is not None and is_paper_summary_request(query):
+                summary = self.summary_store.get(url, level)
+                if summary is not None:
+                    print(f"Serving precomputed summary of {url}")
+                    return summary
+
+            # Reuse the agent executor and bind the paper of this request for its tools
+            agent = self._get_agent(self._is_summary_request(query))
             
             # Add context about the paper to the query
             enhanced_query = f"""You are a research assistant. Please answer this question about the research paper as expected by the user:
@@ -144,25 +434,46 @@ You have access to the following tools:
 """
             
             # Process the question using the agent with URL context
-            response = self.agent.run({
-                "input": enhanced_query,
-                "url": url,
-                "title": title,
-                "level": level,
-                "chat_history": []
-            })
+            token = _request_context.set(RequestContext(url=url, title=title, level=level))
+            try:
+                response = agent.run({
+                    "input": enhanced_query,
+                    "url": url,
+                    "title": title,
+                    "level": level,
+                    "chat_history": []
+                }, callbacks=[_ToolEventHandler(on_event)] if on_event is not None else None)
+            finally:
+                _request_context.reset(token)
             return response
             
         except Exception as e:
             return f"Error processing question: {str(e)}"
 
-    def _initialize_agent_tools(self, url: str, query: str, title: str) -> Dict[str, Any]:
+    def _get_agent(self, include_summary: bool):
+        """
+        Get the agent executor with or without the summary tool, building it on first use.
+        """
+        with self._agents_lock:
+            agent = self._agents.get(include_summary)
+            if agent is None:
+                agent = self._initialize_agent_tools(include_summary)["agent"]
+                self._agents[include_summary] = agent
+            return agent
+
+    def _current_request(self) -> RequestContext:
+        context = _request_context.get()
+        if context is None:
+            raise RuntimeError("Agent tools used outside of process_question")
+        return context
+
+    def _initialize_agent_tools(self, include_summary: bool) -> Dict[str, Any]:
         """
         Initialize the agent with its tools and LLM.
+        The tools read the paper of the current request from the request context.
         
         Args:
-            url (str): The URL of the paper
-            query (str): The user's query
+            include_summary (bool): Whether to include the summary tool, only offered to summary requests
         """
         # Determine which tools to include based on the query
         tools = []
@@ -171,17 +482,17 @@ You have access to the following tools:
         tools.append(
             Tool(
                 name="Research Paper Retriever",
-                func=lambda q: self.pinecone_retriever_fn(q, url),
+                func=lambda q: self.pinecone_retriever_fn(q, self._current_request().url),
                 description="Use this tool to search through the indexed research paper content. Input should be a specific question about the paper's content. The tool will return relevant excerpts from the paper that can help answer the question."
             )
         )
         
         # Only include the summary tool if the query is asking for a summary
-        if self._is_summary_request(query):
+        if include_summary:
             tools.append(
                 Tool(
                     name="Paper Summary Generator",
-                    func=lambda text: self.structured_summary_fn(text, url),
+                    func=lambda text: self.structured_summary_fn(text, self._current_request().url),
                     description="Use this tool to generate summary of the entire research paper. Input should be the text content you want summarized. The tool will analyze the text and provide a structured summary covering key points, methods, findings, and conclusions."
                 )
             )
@@ -190,7 +501,7 @@ You have access to the following tools:
         tools.append(
             Tool(
                 name="Paper Recommender",
-                func=lambda _: self.recommend_papers_fn(title),
+                func=lambda _: self.recommend_papers_fn(self._current_request().title),
                 description="Use this tool to find and recommend relevant research papers from arXiv based on the current paper's title. The tool will return a list of relevant papers with their titles, authors, and summaries. The title is automatically provided from the current context.",
                 return_direct=True
             )
@@ -228,7 +539,9 @@ You have access to the following tools:
             if not title:
                 return "No title provided to find similar papers."
                 
-            # Return raw results from arXiv search
+            # Return raw results from arXiv search, cached by title when a cache is configured
+            if self.recommendation_cache is not None:
+                return self.recommendation_cache.get(title)
             return self.arxiv.run(title)
             
         except Exception as e:
@@ -0,0 +1,90 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from agent import ResearchAgent
+
+
+class AgentPool:
+    """
+    Pool of ResearchAgents keyed by Groq API key.
+    Each agent keeps its ChatGroq client (and its HTTP connections) and agent
+    executors across requests. Agents unused for longer than the idle timeout,
+    or beyond the pool size, are dropped least recently used first.
+    """
+
+    def __init__(self, factory: Callable[[str], "ResearchAgent"], idle_ttl_seconds: float = 900, max_agents: int = 64):
+        """
+        Initialize the pool.
+
+        Args:
+            factory (Callable[[str], ResearchAgent]): Builds the agent for a Groq API key
+            idle_ttl_seconds (float): Seconds an agent may stay unused before it is evicted
+            max_agents (int): Maximum number of pooled agents
+        """
+        self.factory = factory
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_agents = max_agents
+        # Digest of the Groq key -> (agent, last used)
+        self._agents: "OrderedDict[str, Tuple[ResearchAgent, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, groq_key: str) -> "ResearchAgent":
+        """
+        Get the agent of a Groq API key, building it on first use.
+        """
+        key = hashlib.sha256(groq_key.encode("utf-8")).hexdigest()
+        agent = self._lookup(key, time.time())
+        if agent is not None:
+            return agent
+
+        # Built outside the lock so a slow factory does not block the other keys
+        built = self.factory(groq_key)
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            entry = self._agents.get(key)
+            if entry is not None:
+                # Another request built this key's agent meanwhile, keep the pooled one
+                self._agents[key] = (entry[0], now)
+                self._agents.move_to_end(key)
+                return entry[0]
+            self._agents[key] = (built, now)
+            while len(self._agents) > self.max_agents:
+                self._agents.popitem(last=False)
+                self.evictions += 1
+            return built
+
+    def clear(self) -> None:
+        with self._lock:
+            self._agents.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"agents": len(self._agents), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _lookup(self, key: str, now: float) -> Optional["ResearchAgent"]:
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._agents.get(key)
+            if entry is None:
+                return None
+            self._agents[key] = (entry[0], now)
+            self._agents.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _evict_idle(self, now: float) -> None:
+        # Called with the lock held, the least recently used agents come first
+        while self._agents:
+            key, (_, last_used) = next(iter(self._agents.items()))
+            if now - last_used <= self.idle_ttl_seconds:
+                break
+            del self._agents[key]
+            self.evictions += 1
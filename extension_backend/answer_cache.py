@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import normalize_query
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    answer: str
+    # Unit-norm query embedding
+    vector: np.ndarray
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers keyed by endpoint, paper URL and reader level.
+    A question is answered from the cache when an earlier question about the same
+    paper and level has the same normalized text or a query embedding within the
+    similarity threshold, so reworded repeats skip retrieval and the LLM.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 2048,
+    ):
+        """
+        Initialize the answer cache.
+
+        Args:
+            embeddings (Embeddings): Embedding model for queries, shared with retrieval so lookups warm its cache
+            similarity_threshold (float): Minimum cosine similarity between query embeddings to reuse an answer
+            ttl_seconds (float): Seconds after which a cached answer is regenerated
+            max_entries (int): Maximum number of answers kept, least recently used are evicted first, 0 disables the cache
+        """
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # (endpoint, url, level, normalized query) -> answer
+        self._entries: "OrderedDict[Tuple[str, str, str, str], CachedAnswer]" = OrderedDict()
+        # (endpoint, url, level) -> keys of its answers
+        self._buckets: Dict[Tuple[str, str, str], Set[Tuple[str, str, str, str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def lookup(self, endpoint: str, url: str, level: Optional[str], query: str) -> Optional[str]:
+        """
+        Find a cached answer to the query or to a semantically equivalent one.
+
+        Args:
+            endpoint (str): Kind of answer, e.g. "query" or "explain"
+            url (str): URL of the paper
+            level (Optional[str]): Reader level of the request
+            query (str): The user's question
+
+        Returns:
+            Optional[str]: The cached answer, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        bucket_key = (endpoint, url, level or "")
+        normalized = normalize_query(query)
+        now = time.time()
+
+        with self._lock:
+            self._expire(bucket_key, now)
+            exact = self._entries.get(bucket_key + (normalized,))
+            if exact is not None:
+                self._entries.move_to_end(bucket_key + (normalized,))
+                self.hits += 1
+                return exact.answer
+            keys = list(self._buckets.get(bucket_key, ()))
+            if not keys:
+                self.misses += 1
+                return None
+            matrix = np.vstack([self._entries[key].vector for key in keys])
+
+        vector = self._query_vector(query)
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+
+        with self._lock:
+            entry = self._entries.get(keys[best])
+            if entry is None or float(scores[best]) < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(keys[best])
+            self.hits += 1
+            self.semantic_hits += 1
+            print(f"Answer cache hit ({float(scores[best]):.3f}): '{query}' ~ '{entry.query}'")
+            return entry.answer
+
+    def store(self, endpoint: str, url: str, level: Optional[str], query: str, answer: str) -> None:
+        """
+        Cache the answer to a query.
+        """
+        if not self.enabled:
+            return
+        bucket_key = (endpoint, url, level or "")
+        key = bucket_key + (normalize_query(query),)
+        entry = CachedAnswer(query=query, answer=answer, vector=self._query_vector(query), created_at=time.time())
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._buckets.setdefault(bucket_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._discard(old_key)
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def invalidate(self, url: str) -> None:
+        """
+        Drop every cached answer about a paper, e.g. after it was re-indexed.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == url]:
+                del self._entries[key]
+                self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _query_vector(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _expire(self, bucket_key: Tuple[str, str, str], now: float) -> None:
+        # Called with the lock held
+        for key in list(self._buckets.get(bucket_key, ())):
+            if now - self._entries[key].created_at > self.ttl_seconds:
+                del self._entries[key]
+                self._discard(key)
+
+    def _discard(self, key: Tuple[str, str, str, str]) -> None:
+        # Called with the lock held, after the entry was removed
+        bucket = self._buckets.get(key[:3])
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[key[:3]]
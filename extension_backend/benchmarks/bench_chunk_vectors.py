@@ -0,0 +1,122 @@
+"""
+Compare chunk vectors pooled from SemanticChunker sentence embeddings against re-embedded chunks.
+
+Usage:
+    python benchmarks/bench_chunk_vectors.py --fixtures benchmarks/fixtures --k 5
+
+For every saved arXiv HTML fixture, each CHUNK_VECTOR_MODE ("reembed", "pool", "hybrid")
+chunks the paper and computes chunk vectors. The report shows how many texts reached the
+model, the time taken, the cosine agreement with the re-embedded vectors, and recall@k of
+pseudo-queries (the first sentence of each chunk) against their source chunk.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.embeddings import HuggingFaceEmbeddings  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+from chunking import DocumentChunker  # noqa: E402
+from html_extractor import blocks_to_text, get_block_backend  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MODES = ["reembed", "pool", "hybrid"]
+
+
+class CountingEmbeddings(Embeddings):
+    """
+    Counts the texts that reach the wrapped model.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.texts += 1
+        return self.embeddings.embed_query(text)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def recall_at_k(chunk_vectors: np.ndarray, query_vectors: np.ndarray, targets: list, k: int) -> float:
+    scores = normalize_rows(query_vectors) @ normalize_rows(chunk_vectors).T
+    top_k = np.argsort(-scores, axis=1)[:, :k]
+    return float(np.mean([target in row for target, row in zip(targets, top_k)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory of saved arXiv HTML pages")
+    parser.add_argument("--model", default="sentence-transformers/all-mpnet-base-v2")
+    parser.add_argument("--k", type=int, default=5, help="Cutoff of the recall metric")
+    parser.add_argument("--structured", action="store_true", help="Chunk along sections instead of the flat page text")
+    args = parser.parse_args()
+
+    fixtures = sorted(
+        os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures) if name.endswith(".html")
+    ) if os.path.isdir(args.fixtures) else []
+    if not fixtures:
+        sys.exit(f"No *.html fixtures in {args.fixtures}, save some with bench_html_extractor.py --download")
+
+    model = HuggingFaceEmbeddings(model_name=args.model, model_kwargs={"device": "cpu"})
+    print(f"{'fixture':<28} {'mode':<8} {'chunks':>7} {'embedded':>9} {'seconds':>8} {'cosine':>7} {f'R@{args.k}':>6} {'R@1':>6}")
+
+    for path in fixtures:
+        with open(path, "rb") as f:
+            blocks = get_block_backend().extract_blocks(f.read())
+        text = blocks_to_text(blocks)
+
+        results = {}
+        for mode in MODES:
+            counter = CountingEmbeddings(model)
+            chunker = DocumentChunker(counter, chunk_vector_mode=mode)
+            start = time.perf_counter()
+            if args.structured:
+                documents, vectors = chunker.split_blocks_and_embed(blocks)
+            else:
+                documents, vectors = chunker.split_text_and_embed(text)
+            results[mode] = (documents, np.asarray(vectors, dtype=np.float32), counter.texts, time.perf_counter() - start)
+
+        # Pseudo-queries: the first sentence of every multi-sentence chunk of the reference run
+        reference_documents, reference_vectors = results["reembed"][0], results["reembed"][1]
+        queries, targets = [], []
+        for i, document in enumerate(reference_documents):
+            sentences = re.split(r"(?<=[.?!])\s+", document.page_content)
+            if len(sentences) > 1 and len(sentences[0]) > 20:
+                queries.append(sentences[0])
+                targets.append(i)
+        query_vectors = np.asarray(model.embed_documents(queries), dtype=np.float32) if queries else None
+
+        for mode in MODES:
+            documents, vectors, embedded, seconds = results[mode]
+            same_chunks = [d.page_content for d in documents] == [d.page_content for d in reference_documents]
+            if same_chunks:
+                cosine = float(np.mean(np.sum(normalize_rows(vectors) * normalize_rows(reference_vectors), axis=1)))
+            else:
+                cosine = float("nan")
+            if query_vectors is not None and same_chunks:
+                recall_k = recall_at_k(vectors, query_vectors, targets, args.k)
+                recall_1 = recall_at_k(vectors, query_vectors, targets, 1)
+            else:
+                recall_k = recall_1 = float("nan")
+            print(
+                f"{os.path.basename(path)[:28]:<28} {mode:<8} {len(documents):>7} {embedded:>9} "
+                f"{seconds:>8.1f} {cosine:>7.3f} {recall_k:>6.3f} {recall_1:>6.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
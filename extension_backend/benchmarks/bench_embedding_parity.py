@@ -0,0 +1,135 @@
+"""
+Check that the quantized and ONNX embedding backends agree with the fp32 PyTorch model.
+
+Usage:
+    python benchmarks/bench_embedding_parity.py --download
+    python benchmarks/bench_embedding_parity.py --fixtures benchmarks/fixtures --k 5 --min-cosine 0.99 --max-recall-drop 0.02
+
+The fixtures directory is not checked in. --download saves DEFAULT_FIXTURE_URLS
+(or the arXiv HTML URLs given after it) into it first, as bench_html_extractor.py
+--download does.
+
+Every saved arXiv HTML fixture is chunked once, then each backend embeds the
+chunks and pseudo-queries (the first sentence of each chunk). The report shows
+the mean and worst cosine agreement of the chunk vectors with the "torch"
+backend, and recall@k of the pseudo-queries against their source chunk.
+The script exits with status 1 if a backend cannot be loaded, if its mean cosine
+on a fixture is below --min-cosine, or if its recall@k on a fixture is more than
+--max-recall-drop below the "torch" row, so it can gate a backend change in CI.
+"""
+import argparse
+import os
+import re
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_html_extractor import download_fixture  # noqa: E402
+from chunking import DocumentChunker  # noqa: E402
+from embedding_backends import EMBEDDING_BACKENDS, load_embeddings  # noqa: E402
+from html_extractor import get_block_backend  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REFERENCE_BACKEND = "torch"
+DEFAULT_FIXTURE_URLS = [
+    "https://arxiv.org/html/1706.03762v7",
+    "https://arxiv.org/html/2401.04088v1",
+]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def recall_at_k(chunk_vectors: np.ndarray, query_vectors: np.ndarray, targets: list, k: int) -> float:
+    scores = normalize_rows(query_vectors) @ normalize_rows(chunk_vectors).T
+    top_k = np.argsort(-scores, axis=1)[:, :k]
+    return float(np.mean([target in row for target, row in zip(targets, top_k)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory of saved arXiv HTML pages")
+    parser.add_argument("--model", default="sentence-transformers/all-mpnet-base-v2")
+    parser.add_argument("--backends", default=",".join(EMBEDDING_BACKENDS), help="Comma-separated backends to compare")
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads per backend")
+    parser.add_argument("--k", type=int, default=5, help="Cutoff of the recall metric")
+    parser.add_argument("--download", nargs="*", default=None,
+                        help="Save these arXiv HTML URLs, DEFAULT_FIXTURE_URLS if none, into the fixtures directory first")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Lowest mean cosine with the torch vectors per fixture")
+    parser.add_argument("--max-recall-drop", type=float, default=0.02, help="Largest recall@k drop below the torch row per fixture")
+    args = parser.parse_args()
+
+    if args.download is not None:
+        for url in args.download or DEFAULT_FIXTURE_URLS:
+            download_fixture(url, args.fixtures)
+
+    fixtures = sorted(
+        os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures) if name.endswith(".html")
+    ) if os.path.isdir(args.fixtures) else []
+    if not fixtures:
+        sys.exit(f"No *.html fixtures in {args.fixtures}, save some with --download")
+
+    backends = [REFERENCE_BACKEND] + [b for b in args.backends.split(",") if b and b != REFERENCE_BACKEND]
+    reference = load_embeddings(args.model, backend=REFERENCE_BACKEND, num_threads=args.threads)
+
+    # Chunk every fixture once with the reference model, so all backends embed the same texts
+    chunker = DocumentChunker(reference, chunk_vector_mode="reembed")
+    papers = []
+    for path in fixtures:
+        with open(path, "rb") as f:
+            documents = chunker.split_blocks_into_chunks(get_block_backend().extract_blocks(f.read()))
+        texts = [document.page_content for document in documents]
+        queries, targets = [], []
+        for i, text in enumerate(texts):
+            sentences = re.split(r"(?<=[.?!])\s+", text)
+            if len(sentences) > 1 and len(sentences[0]) > 20:
+                queries.append(sentences[0])
+                targets.append(i)
+        papers.append((os.path.basename(path), texts, queries, targets))
+
+    print(f"{'fixture':<28} {'backend':<10} {'chunks':>7} {'cosine':>7} {'min cos':>8} {f'R@{args.k}':>6} {'R@1':>6}")
+    reference_vectors, reference_recall = {}, {}
+    failures = []
+    for backend in backends:
+        try:
+            model = reference if backend == REFERENCE_BACKEND else load_embeddings(args.model, backend=backend, num_threads=args.threads)
+        except Exception as e:
+            failures.append(f"{backend}: could not be loaded: {str(e)}")
+            continue
+        for name, texts, queries, targets in papers:
+            vectors = np.asarray(model.embed_documents(texts), dtype=np.float32)
+            reference_vectors.setdefault(name, vectors)
+            agreement = np.sum(normalize_rows(vectors) * normalize_rows(reference_vectors[name]), axis=1)
+            if queries:
+                query_vectors = np.asarray([model.embed_query(query) for query in queries], dtype=np.float32)
+                recall_k = recall_at_k(vectors, query_vectors, targets, args.k)
+                recall_1 = recall_at_k(vectors, query_vectors, targets, 1)
+            else:
+                recall_k = recall_1 = float("nan")
+            print(
+                f"{name[:28]:<28} {backend:<10} {len(texts):>7} {float(np.mean(agreement)):>7.4f} "
+                f"{float(np.min(agreement)):>8.4f} {recall_k:>6.3f} {recall_1:>6.3f}"
+            )
+
+            reference_recall.setdefault(name, recall_k)
+            if float(np.mean(agreement)) < args.min_cosine:
+                failures.append(f"{backend} on {name}: mean cosine {float(np.mean(agreement)):.4f} < {args.min_cosine}")
+            if queries and reference_recall[name] - recall_k > args.max_recall_drop:
+                failures.append(
+                    f"{backend} on {name}: R@{args.k} {recall_k:.3f} is more than {args.max_recall_drop} "
+                    f"below {REFERENCE_BACKEND} ({reference_recall[name]:.3f})"
+                )
+
+    if failures:
+        print("\nParity check failed:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nParity check passed")
+
+
+if __name__ == "__main__":
+    main()
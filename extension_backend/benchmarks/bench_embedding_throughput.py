@@ -0,0 +1,68 @@
+"""
+Measure embedding throughput and single-query latency of each inference backend.
+
+Usage:
+    python benchmarks/bench_embedding_throughput.py --texts 512 --batch-sizes 1,16,64 --threads 4
+
+Each backend embeds the same synthetic chunk-sized texts at several batch sizes
+after a warm-up call. The report shows texts/s per batch size and the median
+latency of a single short query, the two costs that dominate ingestion and
+retrieval respectively.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_backends import EMBEDDING_BACKENDS, load_embeddings  # noqa: E402
+
+SENTENCE = (
+    "The Transformer replaces recurrence with multi-head self-attention, letting every position "
+    "attend to every other position of the sequence in a constant number of operations. "
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="sentence-transformers/all-mpnet-base-v2")
+    parser.add_argument("--backends", default=",".join(EMBEDDING_BACKENDS), help="Comma-separated backends to compare")
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads per backend")
+    parser.add_argument("--texts", type=int, default=512, help="Texts embedded per batch size")
+    parser.add_argument("--batch-sizes", default="1,16,64", help="Comma-separated batch sizes")
+    parser.add_argument("--queries", type=int, default=50, help="Single queries timed for the latency")
+    args = parser.parse_args()
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    # Chunk-sized texts of varying length, distinct so no layer can cache them
+    texts = [f"Chunk {i}. " + SENTENCE * (2 + i % 6) for i in range(args.texts)]
+
+    header = " ".join(f"{f'b={size} t/s':>10}" for size in batch_sizes)
+    print(f"{'backend':<10} {'load s':>7} {header} {'query ms':>9}")
+    for backend in [b for b in args.backends.split(",") if b]:
+        start = time.perf_counter()
+        model = load_embeddings(args.model, backend=backend, num_threads=args.threads)
+        load_seconds = time.perf_counter() - start
+        model.embed_documents(texts[:8])
+
+        throughputs = []
+        for size in batch_sizes:
+            start = time.perf_counter()
+            for i in range(0, len(texts), size):
+                model.embed_documents(texts[i:i + size])
+            throughputs.append(len(texts) / (time.perf_counter() - start))
+
+        latencies = []
+        for i in range(args.queries):
+            start = time.perf_counter()
+            model.embed_query(f"How does multi-head attention work in layer {i}?")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        row = " ".join(f"{throughput:>10.1f}" for throughput in throughputs)
+        print(f"{backend:<10} {load_seconds:>7.1f} {row} {statistics.median(latencies):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
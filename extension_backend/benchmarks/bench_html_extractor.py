@@ -0,0 +1,86 @@
+"""
+Benchmark the HTML extractor backends on saved arXiv HTML pages.
+
+Usage:
+    python benchmarks/bench_html_extractor.py --download https://arxiv.org/html/1706.03762v7
+    python benchmarks/bench_html_extractor.py --fixtures benchmarks/fixtures --repeat 5
+
+Every installed backend is timed on every *.html file of the fixtures directory,
+and its output is compared with the bs4 reference output.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_extractor import DOWNLOAD_CHUNK_SIZE, available_backends, get_backend, stream_html  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def download_fixture(url: str, fixtures_dir: str) -> str:
+    os.makedirs(fixtures_dir, exist_ok=True)
+    path = os.path.join(fixtures_dir, url.rstrip("/").split("/")[-1] + ".html")
+    with open(path, "wb") as f:
+        for chunk in stream_html(url):
+            f.write(chunk)
+    print(f"Saved {url} to {path}")
+    return path
+
+
+def token_agreement(text: str, reference: str) -> float:
+    tokens, reference_tokens = set(text.split()), set(reference.split())
+    if not reference_tokens:
+        return 1.0
+    return len(tokens & reference_tokens) / len(tokens | reference_tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory of saved arXiv HTML pages")
+    parser.add_argument("--download", nargs="*", default=[], help="arXiv HTML URLs to save into the fixtures directory first")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per backend and fixture")
+    args = parser.parse_args()
+
+    for url in args.download:
+        download_fixture(url, args.fixtures)
+
+    fixtures = sorted(
+        os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures) if name.endswith(".html")
+    ) if os.path.isdir(args.fixtures) else []
+    if not fixtures:
+        sys.exit(f"No *.html fixtures in {args.fixtures}, save some with --download")
+
+    backends = available_backends()
+    print(f"Backends: {', '.join(backends)}\n")
+    print(f"{'fixture':<32} {'backend':<12} {'KB':>8} {'mean ms':>10} {'stream ms':>10} {'chars':>9} {'agree':>7}")
+
+    for path in fixtures:
+        with open(path, "rb") as f:
+            html = f.read()
+        chunks = [html[i:i + DOWNLOAD_CHUNK_SIZE] for i in range(0, len(html), DOWNLOAD_CHUNK_SIZE)]
+        reference = get_backend("bs4").extract_text(html)
+
+        for name in backends:
+            backend = get_backend(name)
+            timings, stream_timings = [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                text = backend.extract_text(html)
+                timings.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                backend.extract_text_streaming(iter(chunks))
+                stream_timings.append(time.perf_counter() - start)
+
+            print(
+                f"{os.path.basename(path)[:32]:<32} {name:<12} {len(html) / 1024:>8.0f} "
+                f"{1000 * sum(timings) / len(timings):>10.1f} {1000 * sum(stream_timings) / len(stream_timings):>10.1f} "
+                f"{len(text):>9} {token_agreement(text, reference):>7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
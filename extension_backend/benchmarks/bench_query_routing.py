@@ -0,0 +1,121 @@
+"""
+Compare answering questions through the ReAct agent with the fast-path router.
+
+Usage:
+    python benchmarks/bench_query_routing.py --llm-latency 0.5 --retrieval-latency 0.1
+
+The chat model and retriever are stubs sleeping for a fixed latency, so the
+report shows the route each question takes and how many LLM round trips it
+costs with and without fast-path routing.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_community.chat_models.fake import FakeListChatModel  # noqa: E402
+
+from context_builder import BuiltContext, ContextBuilder  # noqa: E402
+from agent import ResearchAgent  # noqa: E402
+from router import QueryRouter  # noqa: E402
+
+QUESTIONS = [
+    "What dataset was used for the English-to-German translation task?",
+    "How does multi-head attention work?",
+    "Explain the positional encoding in simple terms",
+    "What BLEU score does the big model reach?",
+    "Can you summarize this paper?",
+    "Recommend similar papers",
+    "Compare the base and big models and then recommend related papers",
+]
+
+# One retriever call followed by a final answer, in the agent's JSON action format
+AGENT_RESPONSES = [
+    "```json\n" + json.dumps({"action": "Research Paper Retriever", "action_input": "attention"}) + "\n```",
+    "```json\n" + json.dumps({"action": "Final Answer", "action_input": "Stub agent answer."}) + "\n```",
+]
+
+
+class CountingChatModel(FakeListChatModel):
+    """
+    Fake chat model cycling through canned responses, counting its calls and
+    sleeping a fixed latency per call, whether invoked or streamed.
+    """
+
+    calls: int = 0
+    # FakeListChatModel's own sleep only applies between streamed characters
+    latency: float = 0.0
+
+    def _call(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        return super()._call(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator:
+        self.calls += 1
+        time.sleep(self.latency)
+        yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+class StubRetriever:
+    """
+    Retriever stand-in returning fixed chunks after a fixed delay.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get_context(self, query: str, url: str, k: int) -> BuiltContext:
+        time.sleep(self.latency)
+        return ContextBuilder().build([
+            {"id": str(i), "metadata": {"chunkIndex": i, "content": f"Chunk {i} relevant to question {i}."}}
+            for i in range(k)
+        ])
+
+
+def run(question: str, fast_path: bool, llm_latency: float, retrieval_latency: float) -> dict:
+    llm = CountingChatModel(responses=AGENT_RESPONSES, latency=llm_latency)
+    agent = ResearchAgent(
+        groq_key="stub",
+        embeddings=None,
+        retriever=StubRetriever(retrieval_latency),
+        llm=llm,
+        fast_path=fast_path,
+    )
+    # Recommendations hit arXiv, keep the benchmark offline
+    agent.recommend_papers_fn = lambda title: "Stub recommendations."
+
+    start = time.perf_counter()
+    _, route = agent.answer_question(question, "https://arxiv.org/html/1706.03762v7", "Attention Is All You Need", "intermediate")
+    return {"route": route, "seconds": time.perf_counter() - start, "llm_calls": llm.calls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per stubbed LLM call")
+    parser.add_argument("--retrieval-latency", type=float, default=0.1, help="Seconds per stubbed retrieval")
+    args = parser.parse_args()
+
+    router = QueryRouter()
+    totals = {"agent": 0.0, "fast": 0.0}
+    print(f"{'route':>10} {'agent s':>8} {'agent calls':>11} {'fast s':>7} {'fast calls':>10}  question")
+    for question in QUESTIONS:
+        agent_run = run(question, False, args.llm_latency, args.retrieval_latency)
+        fast_run = run(question, True, args.llm_latency, args.retrieval_latency)
+        totals["agent"] += agent_run["seconds"]
+        totals["fast"] += fast_run["seconds"]
+        print(
+            f"{router.route(question):>10} {agent_run['seconds']:>8.2f} {agent_run['llm_calls']:>11} "
+            f"{fast_run['seconds']:>7.2f} {fast_run['llm_calls']:>10}  {question}"
+        )
+
+    print(f"\nTotal: agent only {totals['agent']:.2f}s, fast-path routing {totals['fast']:.2f}s "
+          f"({totals['agent'] / max(totals['fast'], 1e-9):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Measure how long the backend takes to import, to accept connections and to become ready.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 3
+    python benchmarks/bench_startup.py --importtime 15
+
+Each run starts a fresh process, so nothing is cached between runs except the
+OS page cache and the model files on disk:
+  - import: `import main` in a new interpreter
+  - live: uvicorn start until GET /healthz answers
+  - ready: uvicorn start until GET /readyz answers 200 (models loaded, vector store connected)
+The server runs with VECTOR_STORE=local on a temporary directory unless
+--pinecone is given. --importtime lists the modules slowest to import, from
+python -X importtime, to find the import that regressed.
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def server_env(store_dir: str, pinecone: bool) -> dict:
+    env = {**os.environ, "RELOAD": "false"}
+    if not pinecone:
+        env.update({"VECTOR_STORE": "local", "LOCAL_VECTOR_STORE_PATH": store_dir})
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_import(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def wait_for(url: str, deadline: float, status: int = 200) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == status:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} did not answer {status} in time")
+
+
+def time_server(env: dict, timeout: float) -> tuple:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        live = wait_for(f"http://127.0.0.1:{port}/healthz", deadline) - start
+        ready = wait_for(f"http://127.0.0.1:{port}/readyz", deadline) - start
+        return live, ready
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def slowest_imports(env: dict, count: int) -> list:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            # Only top-level imports, nested ones are included in their parent's cumulative time
+            depth = (len(match.group(3)) - 1) // 2
+            rows.append((int(match.group(2)) / 1e6, depth, match.group(4)))
+    top_level = [row for row in rows if row[1] <= 1]
+    return sorted(top_level, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per measurement")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for readiness")
+    parser.add_argument("--pinecone", action="store_true", help="Use the configured Pinecone index")
+    parser.add_argument("--importtime", type=int, default=0, help="Also list this many slowest imports")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        env = server_env(store_dir, args.pinecone)
+        imports, lives, readies = [], [], []
+        for run in range(args.runs):
+            imports.append(time_import(env))
+            live, ready = time_server(env, args.timeout)
+            lives.append(live)
+            readies.append(ready)
+            print(f"run {run + 1}: import {imports[-1]:.2f}s, live {live:.2f}s, ready {ready:.2f}s")
+
+        print(f"\nMedian: import {statistics.median(imports):.2f}s, live {statistics.median(lives):.2f}s, "
+              f"ready {statistics.median(readies):.2f}s")
+
+        if args.importtime:
+            print(f"\n{'seconds':>8}  module")
+            for seconds, _, module in slowest_imports(env, args.importtime):
+                print(f"{seconds:>8.3f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark ResearchAgent.generate_structured_summary with a stubbed LLM and retriever.
+
+Usage:
+    python benchmarks/bench_structured_summary.py --llm-latency 0.8 --retrieval-latency 0.1
+
+The stubs sleep for a fixed latency, so the report isolates how the summary
+questions are scheduled: serially (concurrency 1) versus fanned out.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_builder import BuiltContext, ContextBuilder  # noqa: E402
+from agent import ResearchAgent, SUMMARY_QUESTIONS  # noqa: E402
+
+
+class StubResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class StubLLM:
+    """
+    Chat model stand-in answering every prompt after a fixed delay.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, prompt: str) -> StubResponse:
+        self.calls += 1
+        time.sleep(self.latency)
+        return StubResponse(f"Stub answer to a {len(prompt)}-character prompt.")
+
+
+class StubRetriever:
+    """
+    Retriever stand-in returning fixed chunks after a fixed delay.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get_context(self, query: str, url: str, k: int) -> BuiltContext:
+        time.sleep(self.latency)
+        return ContextBuilder().build([
+            {"id": str(i), "metadata": {"chunkIndex": i, "content": f"Chunk {i} relevant to question {i}."}}
+            for i in range(k)
+        ])
+
+
+def run(concurrency: int, llm_latency: float, retrieval_latency: float) -> dict:
+    llm = StubLLM(llm_latency)
+    agent = ResearchAgent(
+        groq_key="stub",
+        embeddings=None,
+        retriever=StubRetriever(retrieval_latency),
+        llm=llm,
+        summary_concurrency=concurrency,
+    )
+    _, timings = agent.generate_structured_summary("Attention Is All You Need", "https://arxiv.org/html/1706.03762v7")
+    return {**timings, "llm_calls": llm.calls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Seconds per stubbed LLM call")
+    parser.add_argument("--retrieval-latency", type=float, default=0.1, help="Seconds per stubbed retrieval")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 2, len(SUMMARY_QUESTIONS)])
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>11} {'llm calls':>9} {'fan-out s':>10} {'synthesis s':>12} {'total s':>8} {'mean retrieval s':>17} {'mean generation s':>18}")
+    for concurrency in args.concurrency:
+        timings = run(concurrency, args.llm_latency, args.retrieval_latency)
+        questions = [q for q in timings["questions"] if "generation_seconds" in q]
+        mean_retrieval = sum(q["retrieval_seconds"] for q in questions) / max(len(questions), 1)
+        mean_generation = sum(q["generation_seconds"] for q in questions) / max(len(questions), 1)
+        print(
+            f"{concurrency:>11} {timings['llm_calls']:>9} {timings['fan_out_seconds']:>10.2f} "
+            f"{timings['synthesis_seconds']:>12.2f} {timings['total_seconds']:>8.2f} "
+            f"{mean_retrieval:>17.2f} {mean_generation:>18.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+Pre-index a list of papers before users ask about them.
+
+Usage:
+    python bulk_index.py --urls trending.txt
+    python bulk_index.py --html-dir saved_papers/ --base-url https://arxiv.org/html/
+
+--urls reads one URL per line, optionally followed by a tab and the paper title.
+--html-dir reads saved arXiv HTML pages, the URL of each page is --base-url
+followed by the file name without its extension (e.g. 1706.03762v7.html).
+
+Papers flow through a pipeline of stages connected by bounded queues: parallel
+fetches, chunking on a few worker threads, one embedding stage batching the
+chunks of several papers into each model call, and concurrent upserts through
+the Indexer. Vector store and model settings are read from the same
+environment variables as the backend. Papers that are already indexed are
+skipped unless --force is given.
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+from chunking import DocumentChunker
+from embedding_backends import load_embeddings
+from embedding_cache import CachedEmbeddings
+from html_extractor import extract_blocks_or_text, fetch_html_blocks_or_text, fetch_html_content, get_backend
+from indexing import Indexer, completion_marker_id
+from manifest import ManifestStore
+from vector_store import LocalVectorStore, PineconeVectorStore, VectorStore
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+PINECONE_INDEX_NAME = 'paperly'
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+@dataclass
+class PaperJob:
+    url: str
+    title: Optional[str] = None
+    html_path: Optional[str] = None
+    blocks: List = field(default_factory=list)
+    text: str = ""
+    documents: List[Document] = field(default_factory=list)
+    vectors: List[Optional[List[float]]] = field(default_factory=list)
+    started_at: float = 0.0
+
+
+@dataclass
+class BulkIndexStats:
+    papers: int = 0
+    skipped: int = 0
+    failed: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    embed_calls: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        return (
+            f"{self.papers} indexed, {self.skipped} skipped, {self.failed} failed in {elapsed:.1f}s: "
+            f"{self.papers / elapsed:.2f} papers/s, {self.chunks / elapsed:.1f} chunks/s, "
+            f"{self.embedded} chunks embedded in {self.embed_calls} model calls"
+        )
+
+
+def read_url_list(path: str) -> List[PaperJob]:
+    jobs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            url, _, title = line.partition("\t")
+            jobs.append(PaperJob(url=url.strip(), title=title.strip() or None))
+    return jobs
+
+
+def read_html_dir(path: str, base_url: str) -> List[PaperJob]:
+    jobs = []
+    for name in sorted(os.listdir(path)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in (".html", ".htm"):
+            jobs.append(PaperJob(url=f"{base_url}{stem}", html_path=os.path.join(path, name)))
+    return jobs
+
+
+def build_vector_store() -> VectorStore:
+    vector_store = os.getenv("VECTOR_STORE", "pinecone")
+    if vector_store == "local":
+        return LocalVectorStore(os.getenv("LOCAL_VECTOR_STORE_PATH", "vector_store"))
+    if vector_store == "pinecone":
+        from pinecone import Pinecone
+
+        api_key = os.getenv("PINECONE_API_KEY")
+        if not api_key:
+            raise ValueError("PINECONE_API_KEY environment variable is not set")
+        index = Pinecone(api_key=api_key).Index(PINECONE_INDEX_NAME)
+        return PineconeVectorStore(index, namespace=os.getenv("PINECONE_NAMESPACE", "ns1"))
+    raise ValueError(f"Unknown VECTOR_STORE: {vector_store}")
+
+
+class BulkIndexer:
+    """
+    Producer/consumer pipeline indexing many papers: fetch -> chunk -> embed -> upsert.
+    Each stage runs on its own threads, so fetching the next papers overlaps with
+    embedding and upserting the previous ones, and the bounded queues between stages
+    keep memory flat when one stage is slower than the others.
+    """
+
+    def __init__(
+        self,
+        chunker: DocumentChunker,
+        indexer: Indexer,
+        embeddings,
+        extraction_mode: str = "structured",
+        fetch_workers: int = 8,
+        chunk_workers: int = 2,
+        upsert_workers: int = 2,
+        embed_batch_size: int = 256,
+        queue_size: int = 16,
+        force: bool = False,
+    ):
+        """
+        Args:
+            chunker (DocumentChunker): Splits papers into chunks, leaving unpooled chunks to the embedding stage
+            indexer (Indexer): Writes the chunks of a paper and its completion marker
+            embeddings (Embeddings): Model embedding the chunks of several papers per call
+            extraction_mode (str): "structured" or "flat", as EXTRACTION_MODE in the backend
+            fetch_workers (int): Concurrent page fetches
+            chunk_workers (int): Papers chunked concurrently
+            upsert_workers (int): Papers upserted concurrently
+            embed_batch_size (int): Chunks gathered across papers before calling the model
+            queue_size (int): Papers buffered between two stages
+            force (bool): Index papers again even if they are already indexed
+        """
+        self.chunker = chunker
+        self.indexer = indexer
+        self.embeddings = embeddings
+        self.extraction_mode = extraction_mode
+        self.fetch_workers = fetch_workers
+        self.chunk_workers = chunk_workers
+        self.upsert_workers = upsert_workers
+        self.embed_batch_size = embed_batch_size
+        self.queue_size = queue_size
+        self.force = force
+        self.stats = BulkIndexStats()
+        self._stats_lock = threading.Lock()
+
+    def run(self, jobs: List[PaperJob]) -> BulkIndexStats:
+        """
+        Index the papers and return the pipeline counters.
+        """
+        self.stats = BulkIndexStats()
+        fetched: "queue.Queue" = queue.Queue(self.queue_size)
+        chunked: "queue.Queue" = queue.Queue(self.queue_size)
+        embedded: "queue.Queue" = queue.Queue(self.queue_size)
+
+        threads = [threading.Thread(target=self._fetch_stage, args=(jobs, fetched), name="fetch")]
+        threads += [
+            threading.Thread(target=self._chunk_stage, args=(fetched, chunked), name=f"chunk-{i}")
+            for i in range(self.chunk_workers)
+        ]
+        threads.append(threading.Thread(target=self._embed_stage, args=(chunked, embedded), name="embed"))
+        threads += [
+            threading.Thread(target=self._upsert_stage, args=(embedded,), name=f"upsert-{i}")
+            for i in range(self.upsert_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"Done: {self.stats.report()}")
+        return self.stats
+
+    def _fetch_stage(self, jobs: List[PaperJob], output: "queue.Queue") -> None:
+        # Submitting only when a fetch slot is free keeps the pool from running ahead of the queue
+        slots = threading.Semaphore(self.fetch_workers)
+
+        def fetch(job: PaperJob) -> None:
+            try:
+                fetched = self._fetch(job)
+                if fetched is not None:
+                    output.put(fetched)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="fetch") as pool:
+            for job in jobs:
+                slots.acquire()
+                pool.submit(fetch, job)
+        for _ in range(self.chunk_workers):
+            output.put(_DONE)
+
+    def _fetch(self, job: PaperJob) -> Optional[PaperJob]:
+        job.started_at = time.perf_counter()
+        try:
+            if not self.force and self.indexer.index.fetch([completion_marker_id(job.url)]):
+                self._count(skipped=1)
+                print(f"Skipping {job.url}, already indexed")
+                return None
+
+            structured = self.extraction_mode == "structured"
+            if job.html_path is not None:
+                with open(job.html_path, 'rb') as f:
+                    html = f.read()
+                if structured:
+                    job.blocks, job.text = extract_blocks_or_text(html)
+                else:
+                    job.text = get_backend().extract_text(html)
+            elif structured:
+                # One download: pages without LaTeXML structure fall back to flat text and semantic splitting
+                job.blocks, job.text = fetch_html_blocks_or_text(job.url, job.title)
+            else:
+                job.text = fetch_html_content(job.url, job.title)
+            return job
+        except Exception as e:
+            self._fail(job, "fetching", e)
+            return None
+
+    def _chunk_stage(self, source: "queue.Queue", output: "queue.Queue") -> None:
+        while True:
+            job = source.get()
+            if job is _DONE:
+                break
+            try:
+                metadata = {"url": job.url, "title": job.title}
+                if job.blocks:
+                    job.documents, job.vectors = self.chunker.split_blocks_and_embed(job.blocks, metadata, embed_missing=False)
+                else:
+                    job.documents, job.vectors = self.chunker.split_text_and_embed(job.text, metadata, embed_missing=False)
+                job.blocks, job.text = [], ""
+                output.put(job)
+            except Exception as e:
+                self._fail(job, "chunking", e)
+        output.put(_DONE)
+
+    def _embed_stage(self, source: "queue.Queue", output: "queue.Queue") -> None:
+        pending: List[PaperJob] = []
+        missing = 0
+        producers = self.chunk_workers
+        while producers:
+            try:
+                # Wait for more papers only while the batch is still small
+                job = source.get(timeout=0.05 if pending else None)
+            except queue.Empty:
+                job = None
+            if job is _DONE:
+                producers -= 1
+            elif job is not None:
+                pending.append(job)
+                missing += len(self._missing(job))
+            if pending and (job is None or missing >= self.embed_batch_size or not producers):
+                self._embed(pending)
+                for ready in pending:
+                    output.put(ready)
+                pending, missing = [], 0
+        for _ in range(self.upsert_workers):
+            output.put(_DONE)
+
+    def _missing(self, job: PaperJob) -> List[int]:
+        # Chunks already in the index (e.g. from an interrupted run) are not embedded again
+        known = self.indexer.known_hashes(job.url)
+        return [
+            i for i, vector in enumerate(job.vectors)
+            if vector is None and job.documents[i].metadata.get("contentHash") not in known
+        ]
+
+    def _embed(self, jobs: List[PaperJob]) -> None:
+        targets: List[Tuple[PaperJob, int]] = [(job, i) for job in jobs for i in self._missing(job)]
+        if not targets:
+            return
+        try:
+            vectors = self.embeddings.embed_documents([job.documents[i].page_content for job, i in targets])
+        except Exception as e:
+            # Leave the vectors empty, the Indexer embeds them per paper
+            print(f"Error embedding a batch of {len(targets)} chunks: {str(e)}")
+            return
+        for (job, i), vector in zip(targets, vectors):
+            job.vectors[i] = vector
+        self._count(embedded=len(targets), embed_calls=1)
+
+    def _upsert_stage(self, source: "queue.Queue") -> None:
+        while True:
+            job = source.get()
+            if job is _DONE:
+                break
+            try:
+                result = self.indexer.index_documents(job.documents, job.url, job.vectors)
+                if not result.success or not result.marker_written:
+                    raise Exception(f"{len(result.failed_ids)} of {result.total_chunks} chunks failed")
+                self._count(papers=1, chunks=result.total_chunks)
+                print(f"Indexed {job.url} ({result.total_chunks} chunks, {time.perf_counter() - job.started_at:.1f}s) | "
+                      f"{self.stats.report()}")
+            except Exception as e:
+                self._fail(job, "indexing", e)
+
+    def _fail(self, job: PaperJob, stage: str, error: Exception) -> None:
+        self._count(failed=1)
+        print(f"Error {stage} {job.url}: {str(error)}")
+
+    def _count(self, **increments: int) -> None:
+        with self._stats_lock:
+            for name, value in increments.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--urls", help="File with one URL per line, optionally followed by a tab and the title")
+    source.add_argument("--html-dir", help="Directory of saved arXiv HTML pages")
+    parser.add_argument("--base-url", default="https://arxiv.org/html/", help="URL prefix of the pages in --html-dir")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="Concurrent page fetches")
+    parser.add_argument("--chunk-workers", type=int, default=2, help="Papers chunked concurrently")
+    parser.add_argument("--upsert-workers", type=int, default=2, help="Papers upserted concurrently")
+    parser.add_argument("--embed-batch", type=int, default=256, help="Chunks embedded per model call, across papers")
+    parser.add_argument("--queue-size", type=int, default=16, help="Papers buffered between stages")
+    parser.add_argument("--force", action="store_true", help="Index papers again even if already indexed")
+    args = parser.parse_args()
+
+    load_dotenv()
+    jobs = read_url_list(args.urls) if args.urls else read_html_dir(args.html_dir, args.base_url)
+    print(f"Indexing {len(jobs)} papers")
+
+    embeddings = CachedEmbeddings(
+        load_embeddings(
+            EMBEDDING_MODEL_NAME,
+            backend=os.getenv("EMBEDDING_BACKEND", "torch"),
+            num_threads=int(os.getenv("EMBEDDING_THREADS", 0)) or None,
+            onnx_file=os.getenv("EMBEDDING_ONNX_FILE") or None,
+        ),
+        max_bytes=int(os.getenv("EMBEDDING_CACHE_MB", 64)) * 1024 * 1024,
+    )
+    indexer = Indexer(
+        embeddings,
+        build_vector_store(),
+        manifests=ManifestStore(os.getenv("INDEX_MANIFEST_PATH", "index_manifests")),
+        max_batch_bytes=int(os.getenv("UPSERT_BATCH_BYTES", 1_500_000)),
+        max_in_flight=int(os.getenv("UPSERT_MAX_IN_FLIGHT", 4)),
+        max_retries=int(os.getenv("UPSERT_MAX_RETRIES", 3)),
+    )
+    chunker = DocumentChunker(
+        embeddings,
+        max_section_chars=int(os.getenv("CHUNK_MAX_SECTION_CHARS", 2000)),
+        chunk_vector_mode=os.getenv("CHUNK_VECTOR_MODE", "hybrid"),
+    )
+    BulkIndexer(
+        chunker,
+        indexer,
+        embeddings,
+        extraction_mode=os.getenv("EXTRACTION_MODE", "structured"),
+        fetch_workers=args.fetch_workers,
+        chunk_workers=args.chunk_workers,
+        upsert_workers=args.upsert_workers,
+        embed_batch_size=args.embed_batch,
+        queue_size=args.queue_size,
+        force=args.force,
+    ).run(jobs)
+
+
+if __name__ == "__main__":
+    main()
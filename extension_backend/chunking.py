@@ -1,21 +1,56 @@
-from langchain.schema import Document
-from langchain_experimental.text_splitter import SemanticChunker
-from typing import List, Dict, Any
+from langchain_core.documents import Document
+from typing import Collection, List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import hashlib
+import numpy as np
 import json
 import os
+import re
+
+from html_extractor import HtmlBlock, BLOCK_SEPARATOR
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash identifying a chunk by its content, independent of its position in the paper.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 class DocumentChunker:
-    def __init__(self, embeddings):
+    def __init__(self, embeddings, max_section_chars: int = 2000, min_section_chars: int = 300, chunk_vector_mode: str = "hybrid", min_pooled_sentences: int = 2):
         """
         Initialize the DocumentChunker with the embedding model.
+        
+        Args:
+            embeddings: The embedding model used for semantic splitting
+            max_section_chars (int): Sections longer than this are split semantically in structured mode
+            min_section_chars (int): Sections shorter than this are merged into the following section in structured mode
+            chunk_vector_mode (str): How split_*_and_embed gets chunk vectors: "reembed" embeds every chunk,
+                "pool" averages the sentence embeddings from breakpoint detection, "hybrid" pools chunks with
+                at least min_pooled_sentences sentences and re-embeds the rest
+            min_pooled_sentences (int): Minimum sentences for a chunk vector to be pooled in hybrid mode
         """
+        if chunk_vector_mode not in ("reembed", "pool", "hybrid"):
+            raise ValueError(f"Unknown chunk vector mode: {chunk_vector_mode}")
         self.embeddings = embeddings
-        self.text_splitter = SemanticChunker(
-            embeddings=self.embeddings,
-            breakpoint_threshold_type="percentile",
-            breakpoint_threshold_amount=65
-        )
+        self.max_section_chars = max_section_chars
+        self.min_section_chars = min_section_chars
+        self.chunk_vector_mode = chunk_vector_mode
+        self.min_pooled_sentences = min_pooled_sentences
+        self._text_splitter = None
+
+    @property
+    def text_splitter(self):
+        # langchain_experimental is slow to import, so the splitter is built on first use
+        if self._text_splitter is None:
+            from langchain_experimental.text_splitter import SemanticChunker
+
+            self._text_splitter = SemanticChunker(
+                embeddings=self.embeddings,
+                breakpoint_threshold_type="percentile",
+                breakpoint_threshold_amount=65
+            )
+        return self._text_splitter
 
     def save_chunks_to_file(self, documents: List[Document], output_file: str = "chunks.json"):
         """
@@ -63,15 +98,7 @@ class DocumentChunker:
         """
         try:
             texts = self.text_splitter.split_text(text)
-            documents = []
-            
-            for i, text_chunk in enumerate(texts):
-                doc_metadata = {
-                    "chunkIndex": i,
-                    "timestamp": datetime.now().isoformat(),
-                    **(metadata or {})
-                }
-                documents.append(Document(page_content=text_chunk, metadata=doc_metadata))
+            documents = self._build_documents([(text_chunk, {}) for text_chunk in texts], metadata)
             
             if save_to_file:
                 self.save_chunks_to_file(documents, output_file)
@@ -80,4 +107,202 @@ class DocumentChunker:
             
         except Exception as e:
             print(f"Error splitting text: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+    def split_blocks_into_chunks(self, blocks: List[HtmlBlock], metadata: Dict[str, Any] = None, save_to_file: bool = False, output_file: str = "chunks.json") -> List[Document]:
+        """
+        Splits structured blocks into chunks along section boundaries, running semantic
+        splitting only inside sections longer than max_section_chars.
+        
+        Args:
+            blocks (List[HtmlBlock]): Blocks of the paper in document order
+            metadata (Dict[str, Any]): Metadata to add to each chunk
+            save_to_file (bool): Whether to save chunks to a file
+            output_file (str): Path to save chunks if save_to_file is True
+            
+        Returns:
+            List[Document]: List of Document objects with section metadata
+        """
+        try:
+            chunks = self._block_chunks(blocks, keep_vectors=False)
+            documents = self._build_documents([(text_chunk, extra) for text_chunk, extra, _ in chunks], metadata)
+
+            if save_to_file:
+                self.save_chunks_to_file(documents, output_file)
+
+            return documents
+
+        except Exception as e:
+            print(f"Error splitting blocks: {str(e)}")
+            raise
+
+    def split_text_and_embed(
+        self, text: str, metadata: Dict[str, Any] = None, known_hashes: Optional[Collection[str]] = None,
+        embed_missing: bool = True
+    ) -> Tuple[List[Document], List[Optional[List[float]]]]:
+        """
+        Splits text into semantic chunks and returns a vector for each chunk, reusing the
+        sentence embeddings computed for breakpoint detection where chunk_vector_mode allows.
+        
+        Args:
+            text (str): The text to split
+            metadata (Dict[str, Any]): Metadata to add to each chunk
+            known_hashes (Optional[Collection[str]]): Content hashes of chunks already indexed, not embedded again
+            embed_missing (bool): Embed chunks without a pooled vector, False leaves them None for the
+                caller to embed, e.g. batched across papers
+            
+        Returns:
+            Tuple[List[Document], List[Optional[List[float]]]]: Chunks and their vectors, None for skipped chunks
+        """
+        try:
+            texts, vectors = self._semantic_split(text)
+            documents = self._build_documents([(text_chunk, {}) for text_chunk in texts], metadata)
+            if not embed_missing:
+                return documents, vectors
+            return documents, self._complete_vectors(texts, vectors, known_hashes)
+        except Exception as e:
+            print(f"Error splitting text: {str(e)}")
+            raise
+
+    def split_blocks_and_embed(
+        self, blocks: List[HtmlBlock], metadata: Dict[str, Any] = None, known_hashes: Optional[Collection[str]] = None,
+        embed_missing: bool = True
+    ) -> Tuple[List[Document], List[Optional[List[float]]]]:
+        """
+        Splits structured blocks into chunks and returns a vector for each chunk, reusing the
+        sentence embeddings of semantically split sections where chunk_vector_mode allows.
+        
+        Args:
+            blocks (List[HtmlBlock]): Blocks of the paper in document order
+            metadata (Dict[str, Any]): Metadata to add to each chunk
+            known_hashes (Optional[Collection[str]]): Content hashes of chunks already indexed, not embedded again
+            embed_missing (bool): Embed chunks without a pooled vector, False leaves them None for the
+                caller to embed, e.g. batched across papers
+            
+        Returns:
+            Tuple[List[Document], List[Optional[List[float]]]]: Chunks with section metadata and their vectors,
+                None for skipped chunks
+        """
+        try:
+            chunks = self._block_chunks(blocks, keep_vectors=True)
+            documents = self._build_documents([(text_chunk, extra) for text_chunk, extra, _ in chunks], metadata)
+            texts = [text_chunk for text_chunk, _, _ in chunks]
+            vectors = [vector for _, _, vector in chunks]
+            if not embed_missing:
+                return documents, vectors
+            return documents, self._complete_vectors(texts, vectors, known_hashes)
+        except Exception as e:
+            print(f"Error splitting blocks: {str(e)}")
+            raise
+
+    def _block_chunks(self, blocks: List[HtmlBlock], keep_vectors: bool) -> List[Tuple[str, Dict[str, Any], Optional[List[float]]]]:
+        """
+        Chunk texts, section metadata and pooled vectors (None when the chunk must be embedded) of structured blocks.
+        """
+        # Group consecutive blocks sharing a section path
+        sections: List[List[HtmlBlock]] = []
+        for block in blocks:
+            if sections and sections[-1][-1].section_path == block.section_path:
+                sections[-1].append(block)
+            else:
+                sections.append([block])
+
+        chunks = []
+        pending: List[HtmlBlock] = []
+        for i, section_blocks in enumerate(sections):
+            section_blocks = pending + section_blocks
+            section_text = BLOCK_SEPARATOR.join(block.text for block in section_blocks)
+
+            # Headings and other short sections are carried into the next section
+            if len(section_text) < self.min_section_chars and i < len(sections) - 1:
+                pending = section_blocks
+                continue
+            pending = []
+
+            if len(section_text) <= self.max_section_chars:
+                texts, vectors = [section_text], [None]
+            elif keep_vectors:
+                texts, vectors = self._semantic_split(section_text)
+            else:
+                texts = self.text_splitter.split_text(section_text)
+                vectors = [None] * len(texts)
+
+            extra = {
+                "section": section_blocks[-1].section,
+                "charStart": section_blocks[0].start,
+                "charEnd": section_blocks[-1].end,
+            }
+            chunks.extend((text_chunk, extra, vector) for text_chunk, vector in zip(texts, vectors))
+        return chunks
+
+    def _semantic_split(self, text: str) -> Tuple[List[str], List[Optional[List[float]]]]:
+        """
+        Same breakpoints as SemanticChunker.split_text, but also pools the sentence
+        embeddings of each chunk into a chunk vector.
+        
+        Returns:
+            Tuple[List[str], List[Optional[List[float]]]]: Chunk texts and pooled vectors, None where the chunk must be re-embedded
+        """
+        splitter = self.text_splitter
+        if self.chunk_vector_mode == "reembed":
+            texts = splitter.split_text(text)
+            return texts, [None] * len(texts)
+
+        single_sentences_list = re.split(splitter.sentence_split_regex, text)
+        if len(single_sentences_list) == 1:
+            return single_sentences_list, [None]
+
+        distances, sentences = splitter._calculate_sentence_distances(single_sentences_list)
+        threshold, breakpoint_array = splitter._calculate_breakpoint_threshold(distances)
+
+        groups = []
+        start_index = 0
+        for index, distance in enumerate(breakpoint_array):
+            if distance > threshold:
+                groups.append(sentences[start_index:index + 1])
+                start_index = index + 1
+        if start_index < len(sentences):
+            groups.append(sentences[start_index:])
+
+        texts, vectors = [], []
+        for group in groups:
+            texts.append(" ".join(d["sentence"] for d in group))
+            # A single sentence's embedding covers its neighbours too, so short chunks are re-embedded in hybrid mode
+            if self.chunk_vector_mode == "pool" or len(group) >= self.min_pooled_sentences:
+                vectors.append(np.mean([d["combined_sentence_embedding"] for d in group], axis=0).tolist())
+            else:
+                vectors.append(None)
+        return texts, vectors
+
+    def _complete_vectors(
+        self, texts: List[str], vectors: List[Optional[List[float]]], known_hashes: Optional[Collection[str]] = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed, in one batch, the chunks that have no pooled vector and are not already indexed.
+        """
+        known = set(known_hashes or ())
+        missing = [
+            i for i, vector in enumerate(vectors)
+            if vector is None and content_hash(texts[i]) not in known
+        ]
+        if missing:
+            embedded = self.embeddings.embed_documents([texts[i] for i in missing])
+            vectors = list(vectors)
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        skipped = sum(1 for vector in vectors if vector is None)
+        print(f"Chunk vectors: {len(vectors) - len(missing) - skipped} pooled, {len(missing)} embedded, {skipped} already indexed")
+        return vectors
+
+    def _build_documents(self, chunks: List[Tuple[str, Dict[str, Any]]], metadata: Dict[str, Any] = None) -> List[Document]:
+        documents = []
+        for i, (text_chunk, extra) in enumerate(chunks):
+            doc_metadata = {
+                "chunkIndex": i,
+                "contentHash": content_hash(text_chunk),
+                "timestamp": datetime.now().isoformat(),
+                **extra,
+                **(metadata or {})
+            }
+            documents.append(Document(page_content=text_chunk, metadata=doc_metadata))
+        return documents
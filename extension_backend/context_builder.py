@@ -0,0 +1,122 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from lexical_index import chunk_key
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate LLM token count, about four characters per token for English text.
+    """
+    return math.ceil(len(text) / 4)
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    # Chunks included in the context, in paper order
+    chunks: List[Dict] = field(default_factory=list)
+    tokens: int = 0
+    budget: int = 0
+    duplicates_dropped: int = 0
+    over_budget_dropped: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.chunks)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "chunks": len(self.chunks),
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "duplicates_dropped": self.duplicates_dropped,
+            "over_budget_dropped": self.over_budget_dropped,
+        }
+
+
+class ContextBuilder:
+    """
+    Assembles retrieved chunks into the context of a prompt.
+    Duplicate and overlapping chunks are dropped, the most relevant chunks are packed
+    up to a token budget, and the packed chunks are laid out in paper order with
+    their section as a heading.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        overlap_threshold: float = 0.9,
+    ):
+        """
+        Initialize the context builder.
+
+        Args:
+            max_tokens (int): Token budget of the context
+            count_tokens (Callable[[str], int]): Token counter, a character-based estimate by default
+            overlap_threshold (float): Word-set Jaccard similarity above which a chunk counts as a duplicate
+        """
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        self.overlap_threshold = overlap_threshold
+
+    def build(self, matches: List[Dict], max_tokens: Optional[int] = None) -> BuiltContext:
+        """
+        Build the context from matches ordered best first.
+
+        Args:
+            matches (List[Dict]): Retrieved matches with their text in metadata "content"
+            max_tokens (Optional[int]): Token budget overriding the default one
+
+        Returns:
+            BuiltContext: The context text, the chunks it contains and its token counts
+        """
+        budget = max_tokens or self.max_tokens
+        context = BuiltContext(text="", budget=budget)
+
+        selected = []
+        seen_keys = set()
+        seen_words: List[set] = []
+        tokens = 0
+        for match in matches:
+            metadata = match.get("metadata") or {}
+            content = re.sub(r"\s+", " ", str(metadata.get("content", ""))).strip()
+            if not content:
+                continue
+
+            key = chunk_key(match)
+            words = set(content.lower().split())
+            if key in seen_keys or any(self._overlaps(words, other) for other in seen_words):
+                context.duplicates_dropped += 1
+                continue
+
+            block = self._format_block(metadata, content)
+            block_tokens = self.count_tokens(block)
+            if tokens + block_tokens > budget:
+                context.over_budget_dropped += 1
+                continue
+
+            seen_keys.add(key)
+            seen_words.append(words)
+            tokens += block_tokens
+            selected.append((match, block))
+
+        # Lay the chunks out in the order they appear in the paper
+        selected.sort(key=lambda item: (item[0].get("metadata") or {}).get("chunkIndex", math.inf))
+        context.chunks = [match for match, _ in selected]
+        context.text = "\n\n".join(block for _, block in selected)
+        context.tokens = self.count_tokens(context.text) if selected else 0
+        return context
+
+    def _overlaps(self, words: set, other: set) -> bool:
+        if not words or not other:
+            return False
+        if words <= other or other <= words:
+            return True
+        return len(words & other) / len(words | other) >= self.overlap_threshold
+
+    def _format_block(self, metadata: Dict, content: str) -> str:
+        section = metadata.get("section")
+        return f"[{section}]\n{content}" if section else content
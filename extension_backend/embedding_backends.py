@@ -0,0 +1,108 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# "torch" runs the fp32 PyTorch model, "torch-int8" quantizes its linear layers to int8 at load time,
+# "onnx" and "onnx-int8" run the model's ONNX export with ONNX Runtime
+EMBEDDING_BACKENDS = ["torch", "torch-int8", "onnx", "onnx-int8"]
+
+# ONNX files shipped in the sentence-transformers model repositories
+DEFAULT_ONNX_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx-int8": "onnx/model_quint8_avx2.onnx",
+}
+
+
+def load_embeddings(
+    model_name: str,
+    device: str = "cpu",
+    backend: str = "torch",
+    num_threads: Optional[int] = None,
+    onnx_file: Optional[str] = None,
+) -> Embeddings:
+    """
+    Load a sentence-transformers embedding model with the given inference backend.
+
+    Args:
+        model_name (str): Sentence-transformers model, e.g. "sentence-transformers/all-mpnet-base-v2"
+        device (str): Device of the torch backends, the ONNX backends run on CPU
+        backend (str): One of EMBEDDING_BACKENDS
+        num_threads (Optional[int]): Intra-op threads of the model, the runtime default if None
+        onnx_file (Optional[str]): ONNX file in the model repository, overriding DEFAULT_ONNX_FILES
+
+    Returns:
+        Embeddings: HuggingFaceEmbeddings, with the same vectors as the fp32 model up to quantization error
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}, expected one of {EMBEDDING_BACKENDS}")
+
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    if backend.startswith("onnx"):
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={
+                "device": "cpu",
+                "backend": "onnx",
+                "model_kwargs": _onnx_model_kwargs(onnx_file or DEFAULT_ONNX_FILES[backend], num_threads),
+            },
+        )
+
+    import torch
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    embeddings = HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": device})
+    if backend == "torch-int8":
+        # Dynamic quantization: int8 weights, activations quantized on the fly, CPU only
+        torch.quantization.quantize_dynamic(embeddings.client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return embeddings
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Embedding model loaded with load_embeddings on first use, or ahead of it with load().
+    Keeps the model load out of application import and startup.
+    """
+
+    def __init__(self, model_name: str, **load_kwargs: Any):
+        """
+        Args:
+            model_name (str): Sentence-transformers model
+            **load_kwargs: Keyword arguments of load_embeddings
+        """
+        self.model_name = model_name
+        self.load_kwargs = load_kwargs
+        self._model: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> Embeddings:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = load_embeddings(self.model_name, **self.load_kwargs)
+        return self._model
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.load().embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.load().embed_documents(texts)
+
+
+def _onnx_model_kwargs(onnx_file: str, num_threads: Optional[int]) -> Dict:
+    model_kwargs = {"file_name": onnx_file, "provider": "CPUExecutionProvider"}
+    if num_threads:
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = num_threads
+        # Operators run one after another, each parallelized over the intra-op threads
+        session_options.inter_op_num_threads = 1
+        model_kwargs["session_options"] = session_options
+    return model_kwargs
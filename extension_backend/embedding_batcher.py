@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+KIND_QUERY = "query"
+KIND_DOCUMENT = "document"
+
+
+@dataclass(eq=False)
+class _EmbeddingRequest:
+    texts: List[str]
+    kind: str
+    future: Future = field(default_factory=Future)
+    vectors: List = field(default_factory=list)
+    # Index of the next text to schedule, and texts scheduled but not embedded yet
+    next: int = 0
+    remaining: int = 0
+
+    def __post_init__(self):
+        self.vectors = [None] * len(self.texts)
+        self.remaining = len(self.texts)
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Embedding server grouping concurrent calls into micro-batches.
+    Calls from any thread are queued, and one worker thread runs the model on up
+    to max_batch_size texts at a time, waiting at most max_wait_ms for more calls
+    to join a batch that is not full. Queries are scheduled ahead of documents and
+    large calls are split across batches, so a query does not wait behind a whole
+    paper being indexed.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        symmetric: bool = True,
+    ):
+        """
+        Initialize the server around an embedding model, the worker starts on first use.
+
+        Args:
+            embeddings (Embeddings): The embedding model to serve, e.g. HuggingFaceEmbeddings
+            max_batch_size (int): Maximum number of texts per model call
+            max_wait_ms (float): Longest a batch that is not full waits for more calls
+            symmetric (bool): The model embeds queries like documents, so queries are batched
+                through embed_documents; otherwise they are embedded one by one with embed_query
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.symmetric = symmetric
+        self._queue: Deque[_EmbeddingRequest] = deque()
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self.batches = 0
+        self.texts = 0
+        self.max_queue_depth = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit([text], KIND_QUERY).result()[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.submit(texts, KIND_DOCUMENT).result()
+
+    def submit(self, texts: List[str], kind: str = KIND_DOCUMENT) -> Future:
+        """
+        Queue texts for embedding.
+
+        Args:
+            texts (List[str]): Texts to embed
+            kind (str): KIND_QUERY or KIND_DOCUMENT
+
+        Returns:
+            Future: Resolves to the vectors of the texts, in order
+        """
+        request = _EmbeddingRequest(texts=list(texts), kind=kind)
+        if not request.texts:
+            request.future.set_result([])
+            return request.future
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Embedding server is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._serve, name="embedding-batcher", daemon=True)
+                self._worker.start()
+            self._queue.append(request)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._condition.notify()
+        return request.future
+
+    def close(self) -> None:
+        """
+        Stop the worker once the queued calls are served.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._worker is not None:
+            self._worker.join()
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            return {
+                "batches": self.batches,
+                "texts": self.texts,
+                "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+                "queued_calls": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+    def _serve(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._run(*batch)
+
+    def _next_batch(self) -> Optional[Tuple[Optional[str], List[Tuple[_EmbeddingRequest, int]]]]:
+        with self._condition:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._condition.wait()
+
+            # Queries go first; a symmetric model embeds them in the same batch as documents
+            if self.symmetric:
+                kind = None
+            elif any(request.kind == KIND_QUERY for request in self._queue):
+                kind = KIND_QUERY
+            else:
+                kind = KIND_DOCUMENT
+            items: List[Tuple[_EmbeddingRequest, int]] = []
+            deadline = time.monotonic() + self.max_wait
+            while True:
+                self._take(kind, items)
+                timeout = deadline - time.monotonic()
+                if len(items) >= self.max_batch_size or timeout <= 0 or self._closed:
+                    break
+                self._condition.wait(timeout)
+            return kind, items
+
+    def _take(self, kind: Optional[str], items: List[Tuple[_EmbeddingRequest, int]]) -> None:
+        # Called with the lock held: schedule queued texts of one kind (any if None), queries then oldest calls first
+        for request in sorted(self._queue, key=lambda request: request.kind != KIND_QUERY):
+            if len(items) >= self.max_batch_size:
+                return
+            if kind is not None and request.kind != kind:
+                continue
+            count = min(len(request.texts) - request.next, self.max_batch_size - len(items))
+            items.extend((request, i) for i in range(request.next, request.next + count))
+            request.next += count
+            if request.next == len(request.texts):
+                self._queue.remove(request)
+
+    def _run(self, kind: Optional[str], items: List[Tuple[_EmbeddingRequest, int]]) -> None:
+        texts = [request.texts[i] for request, i in items]
+        try:
+            if kind != KIND_QUERY:
+                vectors = self.embeddings.embed_documents(texts)
+            else:
+                vectors = [self.embeddings.embed_query(text) for text in texts]
+        except Exception as e:
+            with self._condition:
+                for request, _ in items:
+                    if request in self._queue:
+                        self._queue.remove(request)
+            for request in {id(request): request for request, _ in items}.values():
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        with self._condition:
+            self.batches += 1
+            self.texts += len(texts)
+        for (request, i), vector in zip(items, vectors):
+            request.vectors[i] = vector
+            request.remaining -= 1
+            if request.remaining == 0 and not request.future.done():
+                request.future.set_result(request.vectors)
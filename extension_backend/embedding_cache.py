@@ -0,0 +1,104 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query for cache lookups: lowercase, trimmed, single-spaced.
+    """
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Memoizing wrapper around an embedding model.
+    Vectors are kept as float32 numpy arrays in an LRU bounded by memory, so
+    repeated queries and re-chunked text skip the model entirely.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache around an embedding model.
+
+        Args:
+            embeddings (Embeddings): The embedding model to wrap, e.g. HuggingFaceEmbeddings
+            max_bytes (int): Memory budget for cached vectors and keys
+        """
+        self.embeddings = embeddings
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        key = ("query", normalize_query(text))
+        vector = self._get(key)
+        if vector is None:
+            vector = self._put(key, self.embeddings.embed_query(key[1]))
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+
+        for i, text in enumerate(texts):
+            vector = self._get(("document", text))
+            if vector is None:
+                missing.setdefault(text, []).append(i)
+            else:
+                vectors[i] = vector
+
+        # Embed each distinct uncached text once, in a single batch
+        if missing:
+            missing_texts = list(missing.keys())
+            for text, embedding in zip(missing_texts, self.embeddings.embed_documents(missing_texts)):
+                vector = self._put(("document", text), embedding)
+                for i in missing[text]:
+                    vectors[i] = vector
+
+        return [vector.tolist() for vector in vectors]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _get(self, key: Tuple[str, str]):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def _put(self, key: Tuple[str, str], embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        size = vector.nbytes + len(key[1])
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = vector
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    old_key, old_vector = self._entries.popitem(last=False)
+                    self._bytes -= old_vector.nbytes + len(old_key[1])
+        return vector
@@ -0,0 +1,159 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+
+class ExecutionOverloaded(Exception):
+    """
+    Raised when a request is rejected because the execution layer queue is full.
+    """
+
+
+# Per-process state of CPU pool workers, built once by _init_cpu_worker
+_worker_embeddings = None
+_worker_chunker = None
+
+
+def _init_cpu_worker(model_name: str, model_kwargs: Dict[str, Any], chunker_kwargs: Dict[str, Any]) -> None:
+    """
+    Load the embedding model and chunker once in each CPU pool process.
+    """
+    global _worker_embeddings, _worker_chunker
+    from embedding_backends import load_embeddings
+    from chunking import DocumentChunker
+
+    _worker_embeddings = load_embeddings(model_name, **model_kwargs)
+    _worker_chunker = DocumentChunker(_worker_embeddings, **chunker_kwargs)
+
+
+def _run_chunker_in_worker(method: str, *args) -> Any:
+    return getattr(_worker_chunker, method)(*args)
+
+
+class ExecutionLayer:
+    """
+    Runs blocking work off the event loop.
+    Network I/O (HTML fetches, Pinecone, Groq) goes to a bounded thread pool and
+    embedding/chunking goes to a separate CPU pool, which can be a process pool.
+    """
+
+    def __init__(
+        self,
+        io_workers: int = 16,
+        cpu_workers: int = 2,
+        use_processes: bool = False,
+        max_queue_depth: int = 64,
+        model_name: Optional[str] = None,
+        model_kwargs: Optional[Dict[str, Any]] = None,
+        chunker_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Initialize the thread and CPU pools.
+
+        Args:
+            io_workers (int): Number of threads for network I/O and LLM calls
+            cpu_workers (int): Number of workers for embedding and chunking
+            use_processes (bool): Run CPU work in a process pool, each worker loading its own model
+            max_queue_depth (int): Maximum number of requests admitted at once, further requests are rejected
+            model_name (Optional[str]): Embedding model loaded by process pool workers
+            model_kwargs (Optional[Dict[str, Any]]): Keyword arguments of load_embeddings for the process pool model
+            chunker_kwargs (Optional[Dict[str, Any]]): Keyword arguments for the process pool DocumentChunker
+        """
+        self.max_queue_depth = max_queue_depth
+        self.use_processes = use_processes
+        self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="paperly-io")
+
+        if use_processes:
+            if not model_name:
+                raise ValueError("model_name is required when use_processes is enabled")
+            self.cpu_pool: Executor = ProcessPoolExecutor(
+                max_workers=cpu_workers,
+                initializer=_init_cpu_worker,
+                initargs=(model_name, model_kwargs or {}, chunker_kwargs or {}),
+            )
+        else:
+            self.cpu_pool = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="paperly-cpu")
+
+        self._active_requests = 0
+        self._rejected_requests = 0
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Admit a request, or raise ExecutionOverloaded if the queue depth limit is reached.
+        """
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self) -> None:
+        """
+        Admit a request that outlives the handler, e.g. a streaming response, released with release().
+        """
+        if self._active_requests >= self.max_queue_depth:
+            self._rejected_requests += 1
+            raise ExecutionOverloaded(
+                f"Server is busy ({self._active_requests} requests in progress), please retry shortly"
+            )
+        self._active_requests += 1
+
+    def release(self) -> None:
+        self._active_requests -= 1
+
+    async def run_io(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking network-bound call on the I/O thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_pool, functools.partial(fn, *args, **kwargs))
+
+    async def stream_io(self, fn: Callable, *args, **kwargs) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run a blocking call on the I/O thread pool and yield the events it emits while running.
+        The call receives an on_event(event, data) callback, its return value is yielded last
+        as a ("result", value) event and its exceptions are raised.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def emit(event: str, data: Any) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+        future = loop.run_in_executor(self.io_pool, functools.partial(fn, *args, on_event=emit, **kwargs))
+        # Done callbacks run on the loop after the events emitted before completion
+        future.add_done_callback(lambda _: queue.put_nowait(None))
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+        yield "result", await future
+
+    async def run_chunker(self, chunker, method: str, *args) -> Any:
+        """
+        Run a DocumentChunker method, e.g. "split_blocks_and_embed", on the CPU pool.
+
+        Args:
+            chunker (DocumentChunker): Chunker used when the CPU pool runs threads
+            method (str): Name of the DocumentChunker method
+            *args: Arguments of the method, picklable when the CPU pool runs processes
+        """
+        loop = asyncio.get_running_loop()
+        if self.use_processes:
+            return await loop.run_in_executor(self.cpu_pool, _run_chunker_in_worker, method, *args)
+        return await loop.run_in_executor(self.cpu_pool, getattr(chunker, method), *args)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active_requests": self._active_requests,
+            "rejected_requests": self._rejected_requests,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+    def shutdown(self) -> None:
+        self.io_pool.shutdown(wait=False, cancel_futures=True)
+        self.cpu_pool.shutdown(wait=False, cancel_futures=True)
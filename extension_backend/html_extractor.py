@@ -1,51 +1,480 @@
+import codecs
+import os
+import re
 import requests
-from bs4 import BeautifulSoup
-from typing import Optional
+from bs4 import BeautifulSoup, NavigableString, Comment, Tag
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
 
-def extract_html_text(url: str) -> str:
+# Backends tried in order when none is configured, fastest first
+BACKEND_PREFERENCE = ["selectolax", "lxml", "bs4"]
+
+DEFAULT_BACKEND = os.getenv("HTML_EXTRACTOR_BACKEND", "auto")
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+BIBLIOGRAPHY_XPATH = "//*[contains(concat(' ', normalize-space(@class), ' '), ' ltx_bibliography ')]"
+
+# LaTeXML classes that open a new level of the section path
+SECTION_CLASSES = {"ltx_abstract", "ltx_chapter", "ltx_section", "ltx_subsection", "ltx_subsubsection", "ltx_appendix", "ltx_paragraph"}
+# LaTeXML classes emitted as one block each, mapped to the block kind
+BLOCK_CLASSES = {
+    "ltx_title_document": "title",
+    "ltx_caption": "caption",
+    "ltx_equation": "equation",
+    "ltx_equationgroup": "equation",
+    "ltx_tabular": "table",
+    "ltx_p": "paragraph",
+}
+BLOCK_SEPARATOR = "\n\n"
+
+
+def normalize_text(text: str) -> str:
     """
-    Extracts and cleans text content from a webpage.
-    
+    Normalize whitespace of extracted page text.
+
     Args:
-        url (str): The URL of the webpage to extract content from
-        
+        text (str): Raw text content of the page
+
     Returns:
-        str: Cleaned text content from the webpage
+        str: Text with one space between phrases and no blank lines
     """
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
+    # Break into lines and remove leading and trailing space
+    lines = (line.strip() for line in text.splitlines())
+    # Break multi-headlines into a line each
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    # Drop blank lines
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+@dataclass
+class HtmlBlock:
+    """
+    A structural block of an arXiv (LaTeXML) paper.
+
+    Attributes:
+        kind (str): "title", "paragraph", "caption", "equation" or "table"
+        text (str): Normalized text of the block, with math as its LaTeX source
+        section_path (List[str]): Titles of the enclosing sections, outermost first
+        start (int): Offset of the block in the text returned by blocks_to_text
+        end (int): End offset of the block in the text returned by blocks_to_text
+    """
+    kind: str
+    text: str
+    section_path: List[str] = field(default_factory=list)
+    start: int = 0
+    end: int = 0
+
+    @property
+    def section(self) -> str:
+        return " > ".join(self.section_path)
+
+
+def blocks_to_text(blocks: List[HtmlBlock]) -> str:
+    """
+    Join blocks into one text, the reference of the block offsets.
+    """
+    return BLOCK_SEPARATOR.join(block.text for block in blocks)
+
+
+class _BlockWalker:
+    """
+    Walks a parsed LaTeXML page in document order and collects HtmlBlocks.
+    Subclasses adapt it to one parser's node API.
+    """
+
+    def __init__(self):
+        self.blocks: List[HtmlBlock] = []
+        self._offset = 0
+
+    def classes(self, node) -> set:
+        raise NotImplementedError
+
+    def children(self, node) -> list:
+        raise NotImplementedError
+
+    def text(self, node) -> str:
+        """
+        Text of a node with math elements replaced by their LaTeX alttext.
+        """
+        raise NotImplementedError
+
+    def walk(self, node, path: List[str]) -> None:
+        node_classes = self.classes(node)
+        if node_classes & SECTION_CLASSES:
+            title_node = next((child for child in self.children(node) if "ltx_title" in self.classes(child)), None)
+            title = normalize_text(self.text(title_node)) if title_node is not None else ""
+            section_path = path + [title] if title else path
+            for child in self.children(node):
+                if child is not title_node:
+                    self.walk(child, section_path)
+            return
+
+        kind = next((BLOCK_CLASSES[name] for name in BLOCK_CLASSES if name in node_classes), None)
+        if kind is not None:
+            self._emit(kind, self.text(node), path)
+            return
+
+        for child in self.children(node):
+            self.walk(child, path)
+
+    def _emit(self, kind: str, text: str, path: List[str]) -> None:
+        text = normalize_text(text)
+        if not text:
+            return
+        start = self._offset + (len(BLOCK_SEPARATOR) if self.blocks else 0)
+        self.blocks.append(HtmlBlock(kind=kind, text=text, section_path=list(path), start=start, end=start + len(text)))
+        self._offset = start + len(text)
+
+
+class _LxmlBlockWalker(_BlockWalker):
+    def classes(self, node) -> set:
+        return set((node.get("class") or "").split())
+
+    def children(self, node) -> list:
+        return [child for child in node if isinstance(child.tag, str)]
+
+    def text(self, node) -> str:
+        parts = [node.text or ""]
+        for child in node:
+            if isinstance(child.tag, str):
+                if child.tag == "math" and child.get("alttext"):
+                    parts.append(f" {child.get('alttext')} ")
+                else:
+                    parts.append(self.text(child))
+            parts.append(child.tail or "")
+        return "".join(parts)
+
+
+class _Bs4BlockWalker(_BlockWalker):
+    def classes(self, node) -> set:
+        return set(node.get("class") or [])
+
+    def children(self, node) -> list:
+        return [child for child in node.children if isinstance(child, Tag)]
+
+    def text(self, node) -> str:
+        parts = []
+        for child in node.children:
+            if isinstance(child, Comment):
+                continue
+            if isinstance(child, NavigableString):
+                parts.append(str(child))
+            elif child.name == "math" and child.get("alttext"):
+                parts.append(f" {child.get('alttext')} ")
+            else:
+                parts.append(self.text(child))
+        return "".join(parts)
+
+
+class ExtractorBackend:
+    """
+    Base class of HTML text extraction backends.
+    Backends drop script, style and ltx_bibliography nodes before taking the page text.
+    The encoding argument is the charset of the HTTP response, None to let the parser
+    detect it from the page.
+    """
+    name = ""
+
+    def extract_text(self, html: bytes, encoding: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    def extract_text_streaming(self, chunks: Iterable[bytes], encoding: Optional[str] = None) -> str:
+        """
+        Extract text from the page as it downloads. Backends without an
+        incremental parser buffer the whole page first.
+        """
+        return self.extract_text(b"".join(chunks), encoding)
+
+    def extract_blocks(self, html: bytes, encoding: Optional[str] = None) -> List[HtmlBlock]:
+        """
+        Extract the structural blocks of a LaTeXML page.
+        """
+        raise NotImplementedError
+
+
+class Bs4Backend(ExtractorBackend):
+    name = "bs4"
+
+    def extract_text(self, html: bytes, encoding: Optional[str] = None) -> str:
+        soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding)
+
         # Remove script and style elements
         for script in soup(["script", "style"]):
             script.decompose()
-            
+
         # Remove bibliography sections
         for bib in soup.find_all(class_="ltx_bibliography"):
             bib.decompose()
-            
-        # Get text content
-        text = soup.get_text()
-        # Break into lines and remove leading and trailing space
-        lines = (line.strip() for line in text.splitlines())
-        # Break multi-headlines into a line each
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        # Drop blank lines
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return text
+
+        return normalize_text(soup.get_text())
+
+    def extract_blocks(self, html: bytes, encoding: Optional[str] = None) -> List[HtmlBlock]:
+        soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding)
+        for script in soup(["script", "style"]):
+            script.decompose()
+        for bib in soup.find_all(class_="ltx_bibliography"):
+            bib.decompose()
+
+        walker = _Bs4BlockWalker()
+        walker.walk(soup.body or soup, [])
+        return walker.blocks
+
+
+class LxmlBackend(ExtractorBackend):
+    name = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        self._lxml_html = lxml.html
+
+    def extract_text(self, html: bytes, encoding: Optional[str] = None) -> str:
+        return self._text_from_root(self._parse(html, encoding))
+
+    def extract_text_streaming(self, chunks: Iterable[bytes], encoding: Optional[str] = None) -> str:
+        # Feed the parser while the page downloads instead of buffering it first
+        parser = self._lxml_html.HTMLParser(encoding=encoding)
+        for chunk in chunks:
+            parser.feed(chunk)
+        return self._text_from_root(parser.close())
+
+    def extract_blocks(self, html: bytes, encoding: Optional[str] = None) -> List[HtmlBlock]:
+        root = self._parse(html, encoding)
+        self._strip(root)
+        body = root.find("body")
+        walker = _LxmlBlockWalker()
+        walker.walk(body if body is not None else root, [])
+        return walker.blocks
+
+    def _parse(self, html: bytes, encoding: Optional[str]):
+        # Without an explicit encoding lxml only honours <meta charset> and falls back to Latin-1
+        return self._lxml_html.document_fromstring(html, parser=self._lxml_html.HTMLParser(encoding=encoding))
+
+    def _strip(self, root) -> None:
+        for element in root.xpath("//script|//style" + "|" + BIBLIOGRAPHY_XPATH):
+            # drop_tree keeps the tail text, like BeautifulSoup's decompose
+            if element.getparent() is not None:
+                element.drop_tree()
+
+    def _text_from_root(self, root) -> str:
+        if root is None:
+            return ""
+        self._strip(root)
+        return normalize_text(root.text_content())
+
+
+class SelectolaxBackend(ExtractorBackend):
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser_cls = LexborHTMLParser
+
+    def extract_text(self, html: bytes, encoding: Optional[str] = None) -> str:
+        tree = self._parser_cls(html.decode(encoding, errors="replace") if encoding else html)
+        tree.strip_tags(["script", "style"])
+        for node in tree.css(".ltx_bibliography"):
+            node.decompose()
+        if tree.root is None:
+            return ""
+        return normalize_text(tree.root.text(separator=""))
+
+
+_BACKEND_CLASSES = {
+    "bs4": Bs4Backend,
+    "lxml": LxmlBackend,
+    "selectolax": SelectolaxBackend,
+}
+_backend_instances = {}
+
+
+def get_backend(name: Optional[str] = None) -> ExtractorBackend:
+    """
+    Get an extraction backend by name.
+
+    Args:
+        name (Optional[str]): "selectolax", "lxml", "bs4", or "auto"/None for the fastest installed one
+
+    Returns:
+        ExtractorBackend: The extraction backend
+    """
+    name = name or DEFAULT_BACKEND
+    if name != "auto":
+        if name not in _backend_instances:
+            if name not in _BACKEND_CLASSES:
+                raise ValueError(f"Unknown HTML extractor backend: {name}")
+            _backend_instances[name] = _BACKEND_CLASSES[name]()
+        return _backend_instances[name]
+
+    for candidate in BACKEND_PREFERENCE:
+        try:
+            return get_backend(candidate)
+        except ImportError:
+            continue
+    raise ImportError("No HTML extractor backend is installed")
+
+
+def available_backends() -> List[str]:
+    """
+    List the names of the backends whose parser is installed.
+    """
+    names = []
+    for name in BACKEND_PREFERENCE:
+        try:
+            get_backend(name)
+            names.append(name)
+        except ImportError:
+            continue
+    return names
+
+
+def get_block_backend(name: Optional[str] = None) -> ExtractorBackend:
+    """
+    Get a backend supporting block extraction, falling back to lxml or bs4
+    when the requested backend only extracts flat text.
+    """
+    backend = get_backend(name)
+    if type(backend).extract_blocks is not ExtractorBackend.extract_blocks:
+        return backend
+    try:
+        return get_backend("lxml")
+    except ImportError:
+        return get_backend("bs4")
+
+
+def response_charset(response: requests.Response) -> Optional[str]:
+    """
+    Charset declared in the Content-Type header of a response, None if missing or unknown.
+    Unlike response.encoding this does not default to ISO-8859-1, so the page's own
+    <meta charset> still applies when the header has no charset.
+    """
+    match = re.search(r"charset=[\"']?([\w.:-]+)", response.headers.get("content-type", ""), re.IGNORECASE)
+    if not match:
+        return None
+    try:
+        return codecs.lookup(match.group(1)).name
+    except LookupError:
+        return None
+
+
+def _read_chunks(response: requests.Response) -> Iterator[bytes]:
+    downloaded = 0
+    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+        downloaded += len(chunk)
+        if downloaded > MAX_DOWNLOAD_BYTES:
+            raise Exception(f"Page is larger than {MAX_DOWNLOAD_BYTES} bytes")
+        yield chunk
+
+
+@contextmanager
+def open_html(url: str, timeout: float = 30) -> Iterator[Tuple[Iterator[bytes], Optional[str]]]:
+    """
+    Start downloading a page, stopping if it grows past MAX_DOWNLOAD_BYTES.
+
+    Args:
+        url (str): The URL of the webpage
+        timeout (float): Connect and read timeout in seconds
+
+    Yields:
+        Tuple[Iterator[bytes], Optional[str]]: Chunks of the raw page and the charset of the response
+    """
+    with requests.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        yield _read_chunks(response), response_charset(response)
+
+
+def stream_html(url: str, timeout: float = 30) -> Iterator[bytes]:
+    """
+    Download a page in chunks, stopping if it grows past MAX_DOWNLOAD_BYTES.
+
+    Args:
+        url (str): The URL of the webpage
+        timeout (float): Connect and read timeout in seconds
+
+    Yields:
+        bytes: Chunks of the raw page
+    """
+    with open_html(url, timeout) as (chunks, _):
+        yield from chunks
+
+
+def extract_html_text(url: str, backend: Optional[str] = None) -> str:
+    """
+    Extracts and cleans text content from a webpage.
+
+    Args:
+        url (str): The URL of the webpage to extract content from
+        backend (Optional[str]): Extraction backend, defaults to HTML_EXTRACTOR_BACKEND
+
+    Returns:
+        str: Cleaned text content from the webpage
+    """
+    try:
+        with open_html(url) as (chunks, encoding):
+            return get_backend(backend).extract_text_streaming(chunks, encoding)
     except Exception as e:
         raise Exception(f"Error extracting content from URL: {str(e)}")
 
+def extract_blocks_or_text(html: bytes, encoding: Optional[str] = None, backend: Optional[str] = None) -> Tuple[List[HtmlBlock], str]:
+    """
+    Extracts the structural blocks of a downloaded paper, or its flat text if it has no LaTeXML markup.
+
+    Args:
+        html (bytes): The raw page
+        encoding (Optional[str]): Charset of the HTTP response, None to detect it from the page
+        backend (Optional[str]): Extraction backend, defaults to HTML_EXTRACTOR_BACKEND
+
+    Returns:
+        Tuple[List[HtmlBlock], str]: Blocks in document order and an empty text, or no blocks and the page text
+    """
+    blocks = get_block_backend(backend).extract_blocks(html, encoding)
+    if blocks:
+        return blocks, ""
+    return [], get_backend(backend).extract_text(html, encoding)
+
+def extract_html_blocks_or_text(url: str, backend: Optional[str] = None) -> Tuple[List[HtmlBlock], str]:
+    """
+    Downloads an arXiv HTML paper once and extracts its structural blocks (section path,
+    paragraphs, captions, equations), or its flat text if the page has no LaTeXML markup.
+
+    Args:
+        url (str): The URL of the paper
+        backend (Optional[str]): Extraction backend, defaults to HTML_EXTRACTOR_BACKEND
+
+    Returns:
+        Tuple[List[HtmlBlock], str]: Blocks in document order and an empty text, or no blocks and the page text
+    """
+    try:
+        with open_html(url) as (chunks, encoding):
+            return extract_blocks_or_text(b"".join(chunks), encoding, backend)
+    except Exception as e:
+        raise Exception(f"Error extracting blocks from URL: {str(e)}")
+
+def fetch_html_blocks_or_text(url: str, title: Optional[str] = None) -> Tuple[List[HtmlBlock], str]:
+    """
+    Fetches a paper from a URL and returns its structural blocks, or its text if it has none.
+
+    Args:
+        url (str): The URL to fetch content from
+        title (Optional[str]): Title of the document
+
+    Returns:
+        Tuple[List[HtmlBlock], str]: Extracted blocks, or the extracted text when there are no blocks
+    """
+    try:
+        return extract_html_blocks_or_text(url)
+    except Exception as e:
+        print(f"Error processing URL: {str(e)}")
+        raise
+
 def fetch_html_content(url: str, title: Optional[str] = None) -> str:
     """
     Fetches HTML content from a URL and returns the extracted text.
-    
+
     Args:
         url (str): The URL to fetch content from
         title (Optional[str]): Title of the document
-        
+
     Returns:
         str: Extracted text content
     """
@@ -54,4 +483,4 @@ def fetch_html_content(url: str, title: Optional[str] = None) -> str:
         return text
     except Exception as e:
         print(f"Error processing URL: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
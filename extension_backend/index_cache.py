@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class IndexedUrlCache:
+    """
+    Bounded LRU cache of URLs known to be fully indexed, with a TTL per entry.
+    Lets the retriever skip the Pinecone probe for papers indexed recently.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 6 * 3600, persist_path: Optional[str] = None):
+        """
+        Initialize the cache, loading persisted entries if a path is given.
+
+        Args:
+            max_size (int): Maximum number of URLs kept, least recently used are evicted first
+            ttl_seconds (float): Seconds after which an entry is re-checked against Pinecone
+            persist_path (Optional[str]): JSON file the cache is saved to so restarts keep hot papers
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.persist_path:
+            self._load()
+
+    def contains(self, url: str) -> bool:
+        """
+        Check if a URL is cached as indexed and its entry has not expired.
+        """
+        with self._lock:
+            indexed_at = self._entries.get(url)
+            if indexed_at is None or time.time() - indexed_at > self.ttl_seconds:
+                if indexed_at is not None:
+                    del self._entries[url]
+                self.misses += 1
+                return False
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return True
+
+    def add(self, url: str) -> None:
+        """
+        Record a URL as fully indexed.
+        """
+        with self._lock:
+            self._entries[url] = time.time()
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, url: str) -> None:
+        """
+        Remove a URL so the next check goes to Pinecone again.
+        """
+        with self._lock:
+            if self._entries.pop(url, None) is not None:
+                self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _load(self) -> None:
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error loading indexed URL cache: {str(e)}")
+            return
+
+        now = time.time()
+        for url, indexed_at in sorted(entries.items(), key=lambda item: item[1]):
+            if now - indexed_at <= self.ttl_seconds:
+                self._entries[url] = indexed_at
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _save(self) -> None:
+        # Called with the lock held
+        if not self.persist_path:
+            return
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(self._entries), f)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            print(f"Error saving indexed URL cache: {str(e)}")
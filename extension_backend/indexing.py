@@ -1,26 +1,100 @@
 
-from langchain.schema import Document
-from typing import List, Dict
+from langchain_core.documents import Document
+from typing import Callable, List, Dict, Optional, Set
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from datetime import datetime
-from sentence_transformers import SentenceTransformer
+import json
+import random
+import time
+from langchain_core.embeddings import Embeddings
 
-from pinecone import Pinecone
+from chunking import content_hash
+from index_cache import IndexedUrlCache
+from manifest import IndexManifest, ManifestStore, manifest_version
+from vector_store import VectorStore
+
+
+def completion_marker_id(url: str) -> str:
+    """
+    ID of the marker vector written once every chunk of a URL is indexed.
+    """
+    return f"doc_{url}_complete"
+
+
+def assign_chunk_ids(documents: List[Document], url: str) -> List[str]:
+    """
+    Vector IDs of the chunks of a URL, derived from their content hash so unchanged
+    chunks keep their ID when a paper is re-indexed. Repeated identical chunks get
+    an occurrence suffix.
+    """
+    ids = []
+    occurrences: Dict[str, int] = {}
+    for doc in documents:
+        digest = doc.metadata.get("contentHash") or content_hash(doc.page_content)
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        ids.append(f"doc_{url}_{digest[:16]}" + (f"_{occurrence}" if occurrence else ""))
+    return ids
+
+
+@dataclass
+class UpsertResult:
+    url: str
+    total_chunks: int
+    batches: int = 0
+    upserted_ids: List[str] = field(default_factory=list)
+    failed_ids: List[str] = field(default_factory=list)
+    marker_written: bool = False
+    # Chunks already in the vector store that were not upserted again
+    skipped: int = 0
+    updated_ids: List[str] = field(default_factory=list)
+    deleted_ids: List[str] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        return self.total_chunks > 0 and not self.failed_ids
 
 
 class Indexer:
-    def __init__(self, embedder: SentenceTransformer, index: Pinecone):
+    def __init__(
+        self,
+        embedder: Embeddings,
+        index: VectorStore,
+        indexed_cache: Optional[IndexedUrlCache] = None,
+        max_batch_bytes: int = 1_500_000,
+        max_batch_size: int = 100,
+        max_in_flight: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        manifests: Optional[ManifestStore] = None,
+    ):
         """
         Initialize the Indexer with required parameters.
         
         Args:
-            embedder (SentenceTransformer): The embedding model to use
-            index_name (str): Name of the Pinecone index
+            embedder (Embeddings): The embedding model to use
+            index (VectorStore): Vector store the documents are written to
             cik (str): Company CIK number
             year (int): Year of the filing
             split (str): Dataset split (train/test/validate)
+            indexed_cache (Optional[IndexedUrlCache]): Cache of indexed URLs, filled once a URL is indexed
+            max_batch_bytes (int): Maximum estimated payload bytes per upsert request
+            max_batch_size (int): Maximum number of vectors per upsert request
+            max_in_flight (int): Maximum number of concurrent upsert requests
+            max_retries (int): Retries per batch before its chunks are reported as failed
+            retry_backoff (float): Base delay in seconds of the exponential retry backoff
+            manifests (Optional[ManifestStore]): Per-URL manifests of indexed chunks for incremental re-indexing
         """
         self.embedder = embedder
         self.index = index
+        self.indexed_cache = indexed_cache
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.manifests = manifests
+        self._upsert_pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="paperly-upsert")
 
 
 
@@ -38,46 +112,216 @@ class Indexer:
             print(f"Error getting index stats: {str(e)}")
             raise
 
-    def index_documents(self, documents: List[Document], url: str) -> None:
+    def index_documents(self, documents: List[Document], url: str, embeddings: Optional[List[Optional[List[float]]]] = None) -> UpsertResult:
         """
         Index documents into Pinecone.
         
+        Chunk IDs are derived from content hashes and compared with the URL's manifest:
+        only new chunks are upserted, chunks that moved get their metadata updated and
+        chunks that disappeared are deleted. The manifest is saved after every batch, so
+        an interrupted ingestion resumes where it stopped.
+        Batches are sized by payload bytes and upserted concurrently with retries.
+        The URL is marked as indexed only once every batch succeeded.
+        
         Args:
             documents (List[Document]): List of Document objects to index
             url (str): URL of the document being indexed
+            embeddings (Optional[List[Optional[List[float]]]]): Precomputed document embeddings, None entries
+                (e.g. chunks skipped by the chunker as already indexed) are computed here when needed
+            
+        Returns:
+            UpsertResult: Upserted, updated, deleted and failed chunk IDs
         """
         print("\nIndexing documents into Pinecone...")
         
         try:
-            # Get embeddings for all documents
-            texts = [doc.page_content for doc in documents]
-            embeddings = self.embedder.embed_documents(texts)
-            # Convert embeddings to list if they're numpy arrays
-            embeddings = [emb.tolist() if hasattr(emb, 'tolist') else emb for emb in embeddings]
+            ids = assign_chunk_ids(documents, url)
+            manifest = self.manifests.load(url) if self.manifests is not None else None
+            previous = dict(manifest.chunks) if manifest is not None else {}
+            manifest = IndexManifest(url=url, chunks=previous, complete=False,
+                                     version=manifest.version if manifest is not None else None)
+            self._save_manifest(manifest)
+
+            # Pinecone rejects null metadata values
+            metadatas = []
+            for doc in documents:
+                metadata = {
+                    **doc.metadata,  # Include all original metadata
+                    "content": doc.page_content,
+                    "url": url
+                }
+                metadatas.append({key: value for key, value in metadata.items() if value is not None})
+
+            # Only chunks missing from the manifest need a vector
+            new = [i for i, vector_id in enumerate(ids) if vector_id not in previous]
+            moved = {
+                ids[i]: {"chunkIndex": metadatas[i].get("chunkIndex"), "section": metadatas[i].get("section", "")}
+                for i, vector_id in enumerate(ids)
+                if vector_id in previous and (
+                    previous[vector_id].get("chunkIndex") != metadatas[i].get("chunkIndex")
+                    or previous[vector_id].get("section", "") != metadatas[i].get("section", "")
+                )
+            }
+            current = set(ids)
+            stale = [vector_id for vector_id in previous if vector_id not in current]
+            if not previous:
+                stale = [vector_id for vector_id in self._listed_ids(url) if vector_id not in current]
+
+            embeddings = list(embeddings) if embeddings is not None else [None] * len(documents)
+            missing = [i for i in new if embeddings[i] is None]
+            if missing:
+                embedded = self.embedder.embed_documents([documents[i].page_content for i in missing])
+                for i, embedding in zip(missing, embedded):
+                    embeddings[i] = embedding
 
             # Prepare vectors for Pinecone
             vectors = []
-            for i, (doc, embedding) in enumerate(zip(documents, embeddings)):
-                vector = {
-                    "id": f"doc_{url}_{doc.metadata.get('chunkIndex', i)}",
-                    "values": embedding,
-                    "metadata": {
-                        **doc.metadata,  # Include all original metadata
-                        "content": doc.page_content,
-                        "url": url
-                    }
-                }
-                vectors.append(vector)
-
-            # Batch upsert to Pinecone (in smaller batches)
-            batch_size = 10
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                try:
-                    self.index.upsert(vectors=batch, namespace="ns1")
-                except Exception as e:
-                    print(f"Error upserting batch: {str(e)}")
-                
+            for i in new:
+                embedding = embeddings[i]
+                # Convert embeddings to list if they're numpy arrays
+                vectors.append({
+                    "id": ids[i],
+                    "values": embedding.tolist() if hasattr(embedding, 'tolist') else embedding,
+                    "metadata": metadatas[i]
+                })
         except Exception as e:
             print(f"Error indexing documents: {str(e)}")
-        print('✅  Completed indexing')
+            raise
+
+        print(f"Chunks: {len(vectors)} new, {len(moved)} moved, {len(ids) - len(vectors) - len(moved)} unchanged, {len(stale)} stale")
+        result = UpsertResult(url=url, total_chunks=len(ids), skipped=len(ids) - len(vectors))
+        batches = self._make_batches(vectors)
+        result.batches = len(batches)
+
+        futures = {self._upsert_pool.submit(self._upsert_with_retry, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            batch_ids = [vector["id"] for vector in batch]
+            try:
+                future.result()
+                result.upserted_ids.extend(batch_ids)
+                for vector in batch:
+                    manifest.chunks[vector["id"]] = self._manifest_entry(vector["metadata"])
+                self._save_manifest(manifest)
+            except Exception as e:
+                print(f"Error upserting batch after {self.max_retries} retries: {str(e)}")
+                result.failed_ids.extend(batch_ids)
+
+        if moved:
+            try:
+                self._with_retry(self.index.update_metadata, moved)
+                result.updated_ids.extend(moved)
+                for vector_id, update in moved.items():
+                    manifest.chunks[vector_id] = {**manifest.chunks[vector_id], **update}
+                self._save_manifest(manifest)
+            except Exception as e:
+                print(f"Error updating moved chunks: {str(e)}")
+                result.failed_ids.extend(moved)
+
+        if stale and result.success:
+            # Stale chunks are removed only once the new version is fully written
+            try:
+                self._with_retry(self.index.delete, stale)
+                result.deleted_ids.extend(stale)
+                for vector_id in stale:
+                    manifest.chunks.pop(vector_id, None)
+                self._save_manifest(manifest)
+            except Exception as e:
+                print(f"Error deleting stale chunks: {str(e)}")
+                result.failed_ids.extend(stale)
+
+        if result.success:
+            # The completion marker is written last, so a partially indexed paper never looks indexed
+            try:
+                self._with_retry(self.index.upsert, [self._completion_marker(url, ids, vectors)])
+            except Exception as e:
+                print(f"Error writing completion marker: {str(e)}")
+                result.marker_written = False
+            else:
+                result.marker_written = True
+                manifest.complete = True
+                manifest.version = manifest_version(ids)
+                self._save_manifest(manifest)
+                if self.indexed_cache is not None:
+                    self.indexed_cache.add(url)
+
+        if result.success and result.marker_written:
+            print(f'✅  Completed indexing {result.total_chunks} chunks in {result.batches} batches')
+        else:
+            print(f'❌  Indexing incomplete: {len(result.failed_ids)} of {result.total_chunks} chunks failed')
+        return result
+
+    def known_hashes(self, url: str) -> Set[str]:
+        """
+        Content hashes of the chunks of a URL already in the vector store, which need no embedding.
+        """
+        if self.manifests is None:
+            return set()
+        manifest = self.manifests.load(url)
+        return manifest.known_hashes() if manifest is not None else set()
+
+    def _listed_ids(self, url: str) -> List[str]:
+        # Chunks written without a manifest, e.g. under the former chunkIndex-based IDs
+        try:
+            ids = self.index.list_ids(prefix=f"doc_{url}_")
+        except Exception as e:
+            print(f"Cannot list existing chunks of {url}, stale chunks are kept: {str(e)}")
+            return []
+        return [vector_id for vector_id in ids if vector_id != completion_marker_id(url)]
+
+    def _manifest_entry(self, metadata: Dict) -> Dict:
+        return {
+            "hash": metadata.get("contentHash") or content_hash(metadata.get("content", "")),
+            "chunkIndex": metadata.get("chunkIndex"),
+            "section": metadata.get("section", ""),
+        }
+
+    def _save_manifest(self, manifest: IndexManifest) -> None:
+        if self.manifests is not None:
+            self.manifests.save(manifest)
+
+    def _make_batches(self, vectors: List[Dict]) -> List[List[Dict]]:
+        """
+        Group vectors into batches bounded by estimated payload bytes and vector count.
+        """
+        batches = []
+        batch, batch_bytes = [], 0
+        for vector in vectors:
+            size = len(json.dumps(vector))
+            if batch and (batch_bytes + size > self.max_batch_bytes or len(batch) >= self.max_batch_size):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(vector)
+            batch_bytes += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _upsert_with_retry(self, batch: List[Dict]) -> None:
+        self._with_retry(self.index.upsert, batch)
+
+    def _with_retry(self, operation: Callable, *args) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                operation(*args)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"Error writing to the vector store (attempt {attempt + 1}), retrying in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+
+    def _completion_marker(self, url: str, ids: List[str], vectors: List[Dict]) -> Dict:
+        # Pinecone rejects all-zero vectors, so the marker holds the mean chunk vector
+        values = [vector["values"] for vector in vectors]
+        if not values:
+            # Nothing new was written, e.g. when resuming, so average stored chunks instead
+            values = [vector["values"] for vector in self.index.fetch(ids[:self.max_batch_size]).values()]
+        dim = len(values[0])
+        centroid = [sum(row[d] for row in values) / len(values) for d in range(dim)]
+        return {
+            "id": completion_marker_id(url),
+            "values": centroid,
+            "metadata": {"url": url, "indexingComplete": True, "chunkCount": len(ids)}
+        }
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class IngestionStatus(str, Enum):
+    PENDING = "pending"
+    INDEXING = "indexing"
+    READY = "ready"
+    FAILED = "failed"
+
+
+@dataclass
+class IngestionRecord:
+    url: str
+    status: IngestionStatus
+    updated_at: float
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "status": self.status.value,
+            "updated_at": self.updated_at,
+            "error": self.error,
+        }
+
+
+class IngestionCoordinator:
+    """
+    Single-flight coordinator for paper ingestion.
+    Concurrent callers for the same URL await one shared ingestion job
+    instead of each running fetch, chunk, embed and upsert on their own.
+    The status table is bounded, least recently updated URLs are dropped first,
+    and READY records expire so the index check runs again.
+    """
+
+    def __init__(
+        self,
+        is_indexed: Callable[[str], Awaitable[bool]],
+        ingest: Callable[[str, Optional[str]], Awaitable[None]],
+        max_records: int = 1024,
+        ready_ttl_seconds: float = 6 * 3600,
+    ):
+        """
+        Initialize the coordinator with the index check and ingestion job.
+
+        Args:
+            is_indexed (Callable): Coroutine function returning True if the URL is already indexed
+            ingest (Callable): Coroutine function fetching, chunking and indexing a URL with its title
+            max_records (int): Maximum number of URLs in the status table
+            ready_ttl_seconds (float): Seconds a READY record skips the index check
+        """
+        self._is_indexed = is_indexed
+        self._ingest = ingest
+        self.max_records = max_records
+        self.ready_ttl_seconds = ready_ttl_seconds
+        self._records: "OrderedDict[str, IngestionRecord]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def status(self, url: str) -> Optional[IngestionRecord]:
+        """
+        Get the ingestion record of a URL, or None if it was never requested or has expired.
+        """
+        return self._current(url)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Get the status table of every URL seen by the coordinator.
+        """
+        for url in list(self._records):
+            self._current(url)
+        return {url: record.to_dict() for url, record in self._records.items()}
+
+    def invalidate(self, url: str) -> None:
+        """
+        Forget the status of a URL so the next request checks the index again.
+        In-flight jobs are left running.
+        """
+        self._records.pop(url, None)
+
+    async def ensure_indexed(self, url: str, title: Optional[str] = None) -> IngestionRecord:
+        """
+        Make sure a URL is indexed, sharing any in-flight ingestion job for it.
+
+        Args:
+            url (str): URL of the paper
+            title (Optional[str]): Title of the paper
+
+        Returns:
+            IngestionRecord: The final record of the URL
+
+        Raises:
+            Exception: The error raised by the shared ingestion job
+        """
+        record = self._current(url)
+        if record and record.status is IngestionStatus.READY:
+            return record
+
+        task = self._inflight.get(url)
+        if task is None:
+            print(f"Starting ingestion job for {url}")
+            task = asyncio.ensure_future(self._run(url, title))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        else:
+            print(f"Joining in-flight ingestion job for {url}")
+
+        # Shield the shared job so one cancelled request does not cancel it for the others
+        return await asyncio.shield(task)
+
+    async def reindex(self, url: str, title: Optional[str] = None) -> IngestionRecord:
+        """
+        Ingest a URL again even if it is indexed, e.g. after the paper's content changed.
+        Waits for any in-flight ingestion job of the URL first. Unchanged chunks are kept
+        in the index, only new, moved and removed chunks are written.
+
+        Args:
+            url (str): URL of the paper
+            title (Optional[str]): Title of the paper
+
+        Returns:
+            IngestionRecord: The final record of the URL
+
+        Raises:
+            Exception: The error raised by the ingestion job
+        """
+        task = self._inflight.get(url)
+        if task is not None:
+            print(f"Waiting for in-flight ingestion job for {url} before re-indexing")
+            try:
+                await asyncio.shield(task)
+            except Exception:
+                pass
+
+        task = self._inflight.get(url)
+        if task is None:
+            print(f"Starting re-indexing job for {url}")
+            task = asyncio.ensure_future(self._run(url, title, force=True))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    def _current(self, url: str) -> Optional[IngestionRecord]:
+        # Expired READY records are dropped, the next request goes through the index check
+        # (and its indexed-URL cache) again
+        record = self._records.get(url)
+        if (
+            record is not None
+            and record.status is IngestionStatus.READY
+            and time.time() - record.updated_at > self.ready_ttl_seconds
+        ):
+            del self._records[url]
+            return None
+        return record
+
+    def _set_status(self, url: str, status: IngestionStatus, error: Optional[str] = None) -> IngestionRecord:
+        record = IngestionRecord(url=url, status=status, updated_at=time.time(), error=error)
+        self._records[url] = record
+        self._records.move_to_end(url)
+        while len(self._records) > self.max_records:
+            self._records.popitem(last=False)
+        return record
+
+    async def _run(self, url: str, title: Optional[str], force: bool = False) -> IngestionRecord:
+        self._set_status(url, IngestionStatus.PENDING)
+        try:
+            if not force and await self._is_indexed(url):
+                print("✅ File already indexed in Pinecone")
+                return self._set_status(url, IngestionStatus.READY)
+
+            self._set_status(url, IngestionStatus.INDEXING)
+            await self._ingest(url, title)
+            print("✅ File indexed in Pinecone")
+            return self._set_status(url, IngestionStatus.READY)
+        except Exception as e:
+            print(f"Error ingesting {url}: {str(e)}")
+            self._set_status(url, IngestionStatus.FAILED, error=str(e))
+            raise
@@ -0,0 +1,189 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from indexing import assign_chunk_ids
+from shard_cache import PaperShardCache
+from vector_store import matches_filter
+
+# Keeps dotted and hyphenated terms such as "3.2", "wmt-14" or "bleu" whole
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "does", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "when", "which", "who",
+    "why", "with", "paper", "used", "use"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_key(match: Dict) -> str:
+    """
+    Key identifying a chunk across dense and lexical results, independent of the vector ID scheme.
+    """
+    metadata = match.get("metadata") or {}
+    if "chunkIndex" in metadata:
+        return f"{metadata.get('url', '')}#{metadata['chunkIndex']}"
+    return match["id"]
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over the chunks of one paper.
+    """
+
+    def __init__(self, ids: List[str], metadata: List[Dict], k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            ids (List[str]): Chunk IDs
+            metadata (List[Dict]): Chunk metadata, the text is read from "content"
+            k1 (float): Term frequency saturation
+            b (float): Document length normalization
+        """
+        self.ids = ids
+        self.metadata = metadata
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(str(meta.get("content", "")))) for meta in metadata]
+        self.lengths = [sum(freqs.values()) for freqs in self.term_freqs]
+        self.avg_length = sum(self.lengths) / max(len(self.lengths), 1)
+
+        doc_freqs: Counter = Counter()
+        for freqs in self.term_freqs:
+            doc_freqs.update(freqs.keys())
+        n = len(self.term_freqs)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+        # Term -> chunks containing it, so a search only scores candidate chunks
+        self.postings: Dict[str, List[int]] = {}
+        for i, freqs in enumerate(self.term_freqs):
+            for term in freqs:
+                self.postings.setdefault(term, []).append(i)
+
+    def search(self, query: str, top_k: int, filter: Optional[Dict] = None) -> List[Dict]:
+        """
+        Score the chunks containing query terms.
+
+        Returns:
+            List[Dict]: Matches shaped like vector store matches, best first
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i in self.postings[term]:
+                tf = self.term_freqs[i][term]
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / max(self.avg_length, 1e-9))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        matches = []
+        for i in sorted(scores, key=lambda i: -scores[i]):
+            if matches_filter(self.metadata[i], filter):
+                matches.append({"id": self.ids[i], "score": scores[i], "metadata": self.metadata[i], "values": []})
+                if len(matches) >= top_k:
+                    break
+        return matches
+
+
+def reciprocal_rank_fusion(rankings: Sequence[List[Dict]], weights: Sequence[float], k: int = 60) -> List[Dict]:
+    """
+    Merge ranked match lists with weighted reciprocal rank fusion: each list adds weight / (k + rank).
+
+    Args:
+        rankings (Sequence[List[Dict]]): Match lists, best first
+        weights (Sequence[float]): Weight of each list
+        k (int): Rank offset damping the influence of the top ranks
+
+    Returns:
+        List[Dict]: Distinct matches ordered by fused score, the score replaced by the fused one
+    """
+    fused: Dict[str, float] = {}
+    matches: Dict[str, Dict] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, match in enumerate(ranking, start=1):
+            key = chunk_key(match)
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+            matches.setdefault(key, match)
+    return [{**matches[key], "score": fused[key]} for key in sorted(fused, key=lambda key: -fused[key])]
+
+
+class LexicalIndexCache:
+    """
+    BM25 indexes of recently used papers.
+    Indexes are built from the chunks at ingestion, or rebuilt from the paper's
+    shard when a paper indexed earlier (e.g. before a restart) is searched.
+    """
+
+    def __init__(self, shard_cache: Optional[PaperShardCache] = None, max_papers: int = 256):
+        """
+        Args:
+            shard_cache (Optional[PaperShardCache]): Source of the chunks of papers not indexed by this process
+            max_papers (int): Maximum number of papers kept, least recently used are evicted first
+        """
+        self.shard_cache = shard_cache
+        self.max_papers = max_papers
+        self._indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, url: str, documents: List[Document]) -> None:
+        """
+        Build the index of a paper from its chunks.
+        """
+        ids = assign_chunk_ids(documents, url)
+        metadata = [{**doc.metadata, "content": doc.page_content, "url": url} for doc in documents]
+        self._put(url, BM25Index(ids, metadata))
+
+    def search(self, url: str, query: str, top_k: int, filter: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """
+        Search the chunks of one paper by keywords.
+
+        Returns:
+            Optional[List[Dict]]: Matches best first, or None if no index is available for the paper
+        """
+        index = self._get(url)
+        if index is None:
+            return None
+        return index.search(query, top_k, filter)
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            self._indexes.pop(url, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"papers": len(self._indexes), "hits": self.hits, "misses": self.misses}
+
+    def _get(self, url: str) -> Optional[BM25Index]:
+        with self._lock:
+            index = self._indexes.get(url)
+            if index is not None:
+                self._indexes.move_to_end(url)
+                self.hits += 1
+                return index
+            self.misses += 1
+
+        if self.shard_cache is None:
+            return None
+        shard = self.shard_cache.get(url)
+        if shard is None:
+            return None
+        index = BM25Index(shard.ids, shard.metadata)
+        self._put(url, index)
+        return index
+
+    def _put(self, url: str, index: BM25Index) -> None:
+        with self._lock:
+            self._indexes[url] = index
+            self._indexes.move_to_end(url)
+            while len(self._indexes) > self.max_papers:
+                self._indexes.popitem(last=False)
@@ -1,30 +1,68 @@
 # main.py
 from fastapi import FastAPI, Header, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Pinecone
-from langchain_groq import ChatGroq
-from pinecone import Pinecone
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+import json
 import os
+import time
 import uvicorn
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Optional
 from models import QueryRequest, Settings
-from html_extractor import fetch_html_content
+from html_extractor import fetch_html_content, fetch_html_blocks_or_text
 from indexing import Indexer
-from agent import ResearchAgent
+from agent_pool import AgentPool
+from router import RouteStats
+from recommendation_cache import RecommendationCache
+from offline_arxiv import OfflineArxivSearch
 from chunking import DocumentChunker
 from retriever import PineconeRetriever
+from ingestion import IngestionCoordinator
+from executor import ExecutionLayer, ExecutionOverloaded
+from index_cache import IndexedUrlCache
+from manifest import ManifestStore
+from embedding_cache import CachedEmbeddings
+from embedding_batcher import BatchingEmbeddings
+from embedding_backends import LazyEmbeddings
+from vector_store import LocalVectorStore, PineconeVectorStore
+from shard_cache import PaperShardCache
+from lexical_index import LexicalIndexCache
+from reranker import CrossEncoderReranker
+from context_builder import ContextBuilder
+from summary_store import SummaryStore, DEFAULT_SUMMARY_LEVEL
+from answer_cache import SemanticAnswerCache
+
+if TYPE_CHECKING:
+    # The agent pulls in langchain_groq and the langchain agents, imported on first use
+    from agent import ResearchAgent
 
 # Load environment variables
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models and connections load in the background, so the server accepts connections right away
+    warm_up_task = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        warm_up_task.cancel()
+        if embedding_batcher is not None:
+            embedding_batcher.close()
+        execution.shutdown()
+
+
 # Create FastAPI app instance
 title = "FastAPI LLM Agent"
 description = (
     "An AI agent using Groq's Gemma model with tools for math solving, summarization, Q&A, "
     "and research paper recommendations via SerpAPI."
 )
-app = FastAPI(title=title, description=description)
+app = FastAPI(title=title, description=description, lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -42,34 +80,319 @@ os.environ["LANGSMITH_ENDPOINT"] = str(os.getenv("LANGSMITH_ENDPOINT"))
 os.environ["LANGSMITH_API_KEY"] = str(os.getenv("LANGSMITH_API_KEY"))
 os.environ["LANGSMITH_PROJECT"] = str(os.getenv("LANGSMITH_PROJECT"))
 
+# Vector store configuration: "pinecone" (hosted) or "local" (per-paper numpy shards on disk)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone")
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", "vector_store")
+
 # Pinecone configuration
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-if not PINECONE_API_KEY:
+if VECTOR_STORE == "pinecone" and not PINECONE_API_KEY:
     raise ValueError("PINECONE_API_KEY environment variable is not set")
 
 PINECONE_INDEX_NAME = 'paperly'
+PINECONE_NAMESPACE = os.getenv("PINECONE_NAMESPACE", "ns1")
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
+# LLM call timeout, how many summary questions are answered concurrently and the deadline of all of them
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", 5))
+SUMMARY_TIMEOUT = float(os.getenv("SUMMARY_TIMEOUT", 2 * LLM_TIMEOUT))
+
+# Answer summary, recommendation and plain questions without the ReAct agent loop
+FAST_PATH_ROUTING = os.getenv("FAST_PATH_ROUTING", "true").lower() == "true"
+
+# Precompute summaries of indexed papers in the background, optionally with per-level variants
+SUMMARY_PRECOMPUTE = os.getenv("SUMMARY_PRECOMPUTE", "false").lower() == "true"
+SUMMARY_LEVELS = [level.strip() for level in os.getenv("SUMMARY_LEVELS", "").split(",") if level.strip()]
+
+# Search arXiv for recommendations after a paper is indexed, before anyone asks for them
+RECOMMENDATION_PREFETCH = os.getenv("RECOMMENDATION_PREFETCH", "false").lower() == "true"
+# JSON catalog searched instead of arXiv, for offline development and tests
+ARXIV_OFFLINE_CATALOG = os.getenv("ARXIV_OFFLINE_CATALOG")
+
+# "structured" chunks along LaTeXML section boundaries, "flat" splits the whole page text semantically
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "structured")
 
 # Initialize embeddings model
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-mpnet-base-v2",
-    model_kwargs={"device": "cpu"}
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+# Inference backend (torch, torch-int8, onnx, onnx-int8) and thread count, shared with process pool workers
+EMBEDDING_MODEL_KWARGS = {
+    "device": "cpu",
+    "backend": os.getenv("EMBEDDING_BACKEND", "torch"),
+    "num_threads": int(os.getenv("EMBEDDING_THREADS", 0)) or None,
+    "onnx_file": os.getenv("EMBEDDING_ONNX_FILE") or None,
+}
+# Loaded by the startup warm-up, or by the first request needing it
+embedding_model = LazyEmbeddings(EMBEDDING_MODEL_NAME, **EMBEDDING_MODEL_KWARGS)
+# Concurrent embedding calls are grouped into micro-batches unless EMBEDDING_BATCHING is disabled
+embedding_batcher = (
+    BatchingEmbeddings(
+        embedding_model,
+        max_batch_size=int(os.getenv("EMBEDDING_MAX_BATCH", 64)),
+        max_wait_ms=float(os.getenv("EMBEDDING_MAX_WAIT_MS", 5)),
+    )
+    if os.getenv("EMBEDDING_BATCHING", "true").lower() == "true"
+    else None
+)
+# Shared by retrieval, chunking and indexing, memoized so repeated text is embedded once
+embeddings = CachedEmbeddings(
+    embedding_batcher or embedding_model,
+    max_bytes=int(os.getenv("EMBEDDING_CACHE_MB", 64)) * 1024 * 1024,
+)
+
+@functools.lru_cache(maxsize=None)
+def pinecone_client():
+    from pinecone import Pinecone
+
+    return Pinecone(api_key=PINECONE_API_KEY)
+
+
+@functools.lru_cache(maxsize=None)
+def arxiv_tool():
+    from langchain_community.tools.arxiv.tool import ArxivQueryRun
+
+    return ArxivQueryRun()
+
+
+# Initialize the vector store, connecting to Pinecone is deferred to the startup warm-up
+if VECTOR_STORE == "local":
+    vector_store = LocalVectorStore(LOCAL_VECTOR_STORE_PATH)
+elif VECTOR_STORE == "pinecone":
+    vector_store = PineconeVectorStore(
+        index_factory=lambda: pinecone_client().Index(PINECONE_INDEX_NAME), namespace=PINECONE_NAMESPACE
+    )
+else:
+    raise ValueError(f"Unknown VECTOR_STORE: {VECTOR_STORE}")
+
+indexed_cache = IndexedUrlCache(
+    max_size=int(os.getenv("INDEXED_CACHE_SIZE", 1024)),
+    ttl_seconds=float(os.getenv("INDEXED_CACHE_TTL", 6 * 3600)),
+    persist_path=os.getenv("INDEXED_CACHE_PATH") or None,
+)
+indexer = Indexer(
+    embeddings,
+    vector_store,
+    indexed_cache=indexed_cache,
+    manifests=ManifestStore(os.getenv("INDEX_MANIFEST_PATH", "index_manifests")),
+    max_batch_bytes=int(os.getenv("UPSERT_BATCH_BYTES", 1_500_000)),
+    max_in_flight=int(os.getenv("UPSERT_MAX_IN_FLIGHT", 4)),
+    max_retries=int(os.getenv("UPSERT_MAX_RETRIES", 3)),
+)
+CHUNKER_KWARGS = {
+    "max_section_chars": int(os.getenv("CHUNK_MAX_SECTION_CHARS", 2000)),
+    "chunk_vector_mode": os.getenv("CHUNK_VECTOR_MODE", "hybrid"),
+}
+chunker = DocumentChunker(embeddings, **CHUNKER_KWARGS)
+shard_cache = PaperShardCache(vector_store, max_bytes=int(os.getenv("SHARD_CACHE_MB", 256)) * 1024 * 1024)
+summary_store = SummaryStore(
+    persist_path=os.getenv("SUMMARY_STORE_PATH", "summary_store.json") or None,
+    ttl_seconds=float(os.getenv("SUMMARY_TTL", 30 * 24 * 3600)),
+)
+recommendation_cache = RecommendationCache(
+    OfflineArxivSearch(ARXIV_OFFLINE_CATALOG).run if ARXIV_OFFLINE_CATALOG else lambda title: arxiv_tool().run(title),
+    ttl_seconds=float(os.getenv("RECOMMENDATION_CACHE_TTL", 7 * 24 * 3600)),
+    negative_ttl_seconds=float(os.getenv("RECOMMENDATION_NEGATIVE_TTL", 3600)),
+    persist_path=os.getenv("RECOMMENDATION_CACHE_PATH") or None,
+)
+answer_cache = SemanticAnswerCache(
+    embeddings,
+    similarity_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95)),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", 3600)),
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", 2048)),
+)
+# BM25 indexes of the papers, fused with dense retrieval unless HYBRID_SEARCH is disabled
+lexical_index = (
+    LexicalIndexCache(shard_cache, max_papers=int(os.getenv("LEXICAL_INDEX_PAPERS", 256)))
+    if os.getenv("HYBRID_SEARCH", "true").lower() == "true" else None
+)
+# Cross-encoder reranking of retrieved chunks, off unless RERANKER_MODEL is set
+RERANKER_MODEL = os.getenv("RERANKER_MODEL")
+reranker = (
+    CrossEncoderReranker(RERANKER_MODEL, batch_size=int(os.getenv("RERANK_BATCH_SIZE", 32)))
+    if RERANKER_MODEL else None
+)
+retriever = PineconeRetriever(
+    embeddings=embeddings,
+    index_name=PINECONE_INDEX_NAME,
+    indexed_cache=indexed_cache,
+    store=vector_store,
+    shard_cache=shard_cache,
+    lexical_index=lexical_index,
+    dense_weight=float(os.getenv("HYBRID_DENSE_WEIGHT", 1.0)),
+    lexical_weight=float(os.getenv("HYBRID_LEXICAL_WEIGHT", 1.0)),
+    rrf_k=int(os.getenv("HYBRID_RRF_K", 60)),
+    reranker=reranker,
+    rerank_candidates=int(os.getenv("RERANK_CANDIDATES", 20)),
+    rerank_top_k=int(os.getenv("RERANK_TOP_K", 4)),
+    context_builder=ContextBuilder(max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", 3000))),
+)
+
+
+
+# Execution layer keeping blocking I/O, embedding and LLM calls off the event loop
+execution = ExecutionLayer(
+    io_workers=int(os.getenv("EXEC_IO_WORKERS", 16)),
+    cpu_workers=int(os.getenv("EXEC_CPU_WORKERS", 2)),
+    use_processes=os.getenv("EXEC_CPU_PROCESSES", "false").lower() == "true",
+    max_queue_depth=int(os.getenv("EXEC_MAX_QUEUE_DEPTH", 64)),
+    model_name=EMBEDDING_MODEL_NAME,
+    model_kwargs=EMBEDDING_MODEL_KWARGS,
+    chunker_kwargs=CHUNKER_KWARGS,
 )
 
-# Initialize Pinecone vectorstore
-index = pc.Index(PINECONE_INDEX_NAME)
-indexer = Indexer(embeddings, index)
-chunker = DocumentChunker(embeddings)
-retriever = PineconeRetriever(embeddings=embeddings, index_name=PINECONE_INDEX_NAME)
 
-# Print all collection names
-print("Available Pinecone collections:")
-for index in pc.list_indexes():
-    print('Index name:',index.name)
+# Fire-and-forget tasks, referenced until they finish
+background_tasks = set()
+
+
+async def is_paper_indexed(url: str) -> bool:
+    return await execution.run_io(retriever.is_file_indexed_in_pinecone, url)
+
+
+async def ingest_paper(url: str, title: Optional[str]) -> None:
+    """
+    Fetch, chunk and index a paper that is not in Pinecone yet.
+    """
+    print(f"Fetching content from URL: {url}")
+    metadata = {
+        "url": url,
+        "title": title
+    }
+    if EXTRACTION_MODE == "structured":
+        # One download: pages without LaTeXML structure come back as flat text
+        blocks, text = await execution.run_io(fetch_html_blocks_or_text, url, title)
+    else:
+        blocks, text = [], await execution.run_io(fetch_html_content, url, title)
+
+    print(f"URL {url} not found in index, proceeding with indexing...")
+    # Chunks indexed by an earlier, possibly interrupted, ingestion are not embedded again
+    known_hashes = await execution.run_io(indexer.known_hashes, url)
+    # Chunk and embed in one stage so sentence embeddings from chunking are reused for chunk vectors
+    if blocks:
+        documents, vectors = await execution.run_chunker(chunker, "split_blocks_and_embed", blocks, metadata, known_hashes)
+    else:
+        # Pages without LaTeXML structure fall back to flat text and semantic splitting
+        documents, vectors = await execution.run_chunker(chunker, "split_text_and_embed", text, metadata, known_hashes)
+    result = await execution.run_io(indexer.index_documents, documents, url, vectors)
+    shard_cache.invalidate(url)
+    if lexical_index is not None:
+        await execution.run_io(lexical_index.add, url, documents)
+    summary_store.invalidate(url)
+    answer_cache.invalidate(url)
+    if RECOMMENDATION_PREFETCH and title:
+        prefetch = asyncio.create_task(execution.run_io(recommendation_cache.prefetch, title))
+        background_tasks.add(prefetch)
+        prefetch.add_done_callback(background_tasks.discard)
+    if not result.success or not result.marker_written:
+        raise Exception(f"Indexing incomplete for {url}: {len(result.failed_ids)} of {result.total_chunks} chunks failed")
+
+
+# Single-flight ingestion so concurrent requests for one paper index it once
+ingestion = IngestionCoordinator(
+    is_indexed=is_paper_indexed,
+    ingest=ingest_paper,
+    max_records=indexed_cache.max_size,
+    ready_ttl_seconds=indexed_cache.ttl_seconds,
+)
+
+route_stats = RouteStats()
 
 
+def build_research_agent(groq_key: str) -> "ResearchAgent":
+    from agent import ResearchAgent
+
+    return ResearchAgent(
+        embeddings=embeddings,
+        groq_key=groq_key,
+        retriever=retriever,
+        summary_concurrency=SUMMARY_CONCURRENCY,
+        llm_timeout=LLM_TIMEOUT,
+        summary_timeout=SUMMARY_TIMEOUT,
+        summary_store=summary_store,
+        fast_path=FAST_PATH_ROUTING,
+        route_stats=route_stats,
+        recommendation_cache=recommendation_cache,
+    )
+
+
+# Agents and their Groq clients reused across requests with the same key
+agent_pool = AgentPool(
+    build_research_agent,
+    idle_ttl_seconds=float(os.getenv("AGENT_POOL_IDLE_TTL", 900)),
+    max_agents=int(os.getenv("AGENT_POOL_SIZE", 64)),
+)
+
+# Background summary precomputation tasks by URL
+summary_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def precompute_summaries(url: str, title: Optional[str], groq_key: str) -> None:
+    """
+    Generate and store the summaries of an indexed paper.
+    """
+    try:
+        research_agent = await execution.run_io(agent_pool.get, groq_key)
+        await execution.run_io(research_agent.precompute_summaries, url, title, SUMMARY_LEVELS)
+        print(f"Precomputed summaries of {url}")
+    except Exception as e:
+        print(f"Error precomputing summaries of {url}: {str(e)}")
+
+
+def schedule_summary_precompute(url: str, title: Optional[str], groq_key: str) -> None:
+    """
+    Start precomputing the summaries of an indexed paper unless they are stored or already being generated.
+    The server's GROQ_API_KEY is used when set, otherwise the key of the triggering request.
+    """
+    if not SUMMARY_PRECOMPUTE or url in summary_tasks:
+        return
+    if summary_store.has(url, [DEFAULT_SUMMARY_LEVEL] + SUMMARY_LEVELS):
+        return
+    task = asyncio.create_task(precompute_summaries(url, title, os.getenv("GROQ_API_KEY") or groq_key))
+    summary_tasks[url] = task
+    task.add_done_callback(lambda _: summary_tasks.pop(url, None))
+
+
+# Startup warm-up progress, reported by /readyz
+readiness: Dict[str, Any] = {"ready": False, "components": {}, "error": None, "started_at": time.time(), "seconds": None}
+
+
+def connect_vector_store() -> None:
+    if VECTOR_STORE != "pinecone":
+        return
+    vector_store.index  # Resolves the index host
+    print("Available Pinecone collections:")
+    for index in pinecone_client().list_indexes():
+        print('Index name:',index.name)
+
+
+def load_embedding_model() -> None:
+    embedding_model.load()
+    # The first inference initializes kernels and thread pools
+    embedding_model.embed_query("warm up")
+
+
+async def warm_up() -> None:
+    """
+    Load the models and open the connections needed to serve requests, in the background.
+    """
+    steps = [("vector_store", connect_vector_store), ("embeddings", load_embedding_model)]
+    if reranker is not None:
+        steps.append(("reranker", lambda: reranker.model))
+    try:
+        await asyncio.gather(*(warm_up_step(name, step) for name, step in steps))
+    except Exception as e:
+        print(f"Error warming up: {str(e)}")
+        readiness["error"] = str(e)
+        return
+    readiness["seconds"] = round(time.time() - readiness["started_at"], 3)
+    readiness["ready"] = True
+    print(f"✅ Ready to serve requests after {readiness['seconds']}s")
+
+
+async def warm_up_step(name: str, step) -> None:
+    start = time.perf_counter()
+    await execution.run_io(step)
+    readiness["components"][name] = round(time.perf_counter() - start, 3)
+
 
 # Dependency to extract all keys from headers
 def get_service_keys(
@@ -84,78 +407,136 @@ def get_service_keys(
     )
 
 
+def get_cache_bypass(x_cache_bypass: Optional[str] = Header(None, alias="X-Cache-Bypass")) -> bool:
+    """
+    Whether the request asks for a freshly generated answer instead of a cached one.
+    """
+    return (x_cache_bypass or "").lower() in ("1", "true", "yes")
+
+
 
 @app.post("/query", summary="Run the AI agent against a user query")
 async def query_endpoint(
     body: QueryRequest,
     keys: Settings = Depends(get_service_keys),
+    cache_bypass: bool = Depends(get_cache_bypass),
 ):
     """
     Handle user queries at a specified difficulty level, with optional paper context.
     """
     try:
-        if body.url:
-            if not retriever.is_file_indexed_in_pinecone(body.url):
-                print("File is not indexed in Pinecone")
-                # Check if URL already exists in the index
-
-                print(f"Fetching content from URL: {body.url}")
-                text = fetch_html_content(body.url, body.title)
-                print(f"URL {body.url} not found in index, proceeding with indexing...")
-                documents = chunker.split_text_into_chunks(text, {
-                    "url": body.url,
-                    "title": body.title
-                })
-
-                indexer.index_documents(documents, body.url)
-                print("✅ File indexed in Pinecone")
+        async with execution.admit():
+            if body.url:
+                if cache_bypass:
+                    answer_cache.record_bypass()
+                else:
+                    answer = await execution.run_io(answer_cache.lookup, "query", body.url, body.level, body.query)
+                    if answer is not None:
+                        return {"status": "success", "message": "URL processed successfully", "answer": answer, "cached": True}
+
+                await ingestion.ensure_indexed(body.url, body.title)
+                schedule_summary_precompute(body.url, body.title, keys.groq_key)
                 
-            else:
-                print("✅ File already indexed in Pinecone")
-            
-            research_agent = ResearchAgent(embeddings=embeddings, groq_key=keys.groq_key,retriever=retriever)
+                research_agent = await execution.run_io(agent_pool.get, keys.groq_key)
+                    
+                # Process the question using the agent
+                answer, route = await execution.run_io(
+                    research_agent.answer_question, body.query, body.url, body.title, body.level
+                )
+                if not answer.startswith("Error"):
+                    await execution.run_io(answer_cache.store, "query", body.url, body.level, body.query, answer)
                 
-            # Process the question using the agent
-            answer = research_agent.process_question(body.query, body.url, body.title, body.level)
-            
-            return {"status": "success", "message": "URL processed successfully", "answer": answer}
+                return {"status": "success", "message": "URL processed successfully", "answer": answer, "cached": False, "route": route}
+    except ExecutionOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         print(f"Error in query endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/explain", summary="Get detailed explanation for a query")
-async def explain_endpoint(
-    body: QueryRequest,
-    keys: Settings = Depends(get_service_keys),
-):
+@app.get("/healthz", summary="Liveness probe")
+async def healthz_endpoint():
     """
-    Provide a detailed explanation for a user query using RAG (Retrieval-Augmented Generation).
+    Return 200 as long as the server process is up, even while models are still loading.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz", summary="Readiness probe")
+async def readyz_endpoint():
+    """
+    Return 200 once the models are loaded and the vector store is connected, 503 before that.
+    """
+    body = {"status": "ready" if readiness["ready"] else "starting", **readiness}
+    if readiness["error"]:
+        body["status"] = "failed"
+    return JSONResponse(body, status_code=200 if readiness["ready"] else 503)
+
+@app.get("/ingestion/status", summary="Get the ingestion status of papers")
+async def ingestion_status_endpoint(url: Optional[str] = None):
+    """
+    Return the ingestion status (pending/indexing/ready/failed) of one paper, or of every paper seen so far.
+    """
+    if url is None:
+        return {"status": "success", "papers": ingestion.snapshot()}
+    record = ingestion.status(url)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No ingestion record for {url}")
+    return {"status": "success", "paper": record.to_dict()}
+
+@app.delete("/ingestion/status", summary="Forget the cached indexing status of a paper")
+async def ingestion_invalidate_endpoint(url: str):
+    """
+    Invalidate the cached status of a paper so the next request checks Pinecone again.
+    """
+    ingestion.invalidate(url)
+    indexed_cache.invalidate(url)
+    shard_cache.invalidate(url)
+    answer_cache.invalidate(url)
+    if lexical_index is not None:
+        lexical_index.invalidate(url)
+    return {"status": "success", "message": f"Invalidated indexing status for {url}"}
+
+@app.post("/ingestion/reindex", summary="Re-index a paper whose content changed")
+async def ingestion_reindex_endpoint(url: str, title: Optional[str] = None):
+    """
+    Fetch and chunk a paper again, writing only the chunks that changed since it was indexed.
     """
     try:
-        print(f"Explaining query: {body.query}")
-        if body.url:
-            if not retriever.is_file_indexed_in_pinecone(body.url):
-                print("File is not indexed in Pinecone")
-                # Check if URL already exists in the index
-
-                print(f"Fetching content from URL: {body.url}")
-                text = fetch_html_content(body.url, body.title)
-                print(f"URL {body.url} not found in index, proceeding with indexing...")
-                documents = chunker.split_text_into_chunks(text, {
-                    "url": body.url,
-                    "title": body.title
-                })
-
-                indexer.index_documents(documents, body.url)
-                
-            else:
-                print("✅ File already indexed in Pinecone")
-                
-        # Retrieve relevant documents from Pinecone
-        context = retriever.pinecone_retriever_fn(body.query, body.url, 5)
-        
-        # Create a prompt template for explanation
-        prompt = f"""Based on the following context from the research paper, provide an explanation for this part of the paper: {body.query}
+        async with execution.admit():
+            indexed_cache.invalidate(url)
+            record = await ingestion.reindex(url, title)
+    except ExecutionOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        print(f"Error in reindex endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "success", "paper": record.to_dict()}
+
+@app.get("/cache/stats", summary="Get cache hit/miss statistics")
+async def cache_stats_endpoint():
+    """
+    Return hit/miss counters of the backend caches, the execution layer load and the question routes taken.
+    """
+    return {
+        "status": "success",
+        "embeddings": embeddings.stats(),
+        "embedding_batches": embedding_batcher.stats() if embedding_batcher is not None else None,
+        "indexed_urls": indexed_cache.stats(),
+        "paper_shards": shard_cache.stats(),
+        "lexical_indexes": lexical_index.stats() if lexical_index is not None else None,
+        "rerank_scores": reranker.stats() if reranker is not None else None,
+        "summaries": summary_store.stats(),
+        "answers": answer_cache.stats(),
+        "agents": agent_pool.stats(),
+        "routes": route_stats.stats(),
+        "recommendations": recommendation_cache.stats(),
+        "execution": execution.stats(),
+    }
+
+def build_explain_prompt(query: str, context: str) -> str:
+    """
+    Create the prompt explaining a passage of the paper from its retrieved context.
+    """
+    return f"""Based on the following context from the research paper, provide an explanation for this part of the paper: {query}
 
 Context:
 {context}
@@ -167,23 +548,206 @@ Please provide a comprehensive explanation that:
 4. Includes examples or analogies where appropriate
 
 Explanation:"""
-        
-        # Use the research agent to generate the explanation
-        llm = ChatGroq(
-            groq_api_key=keys.groq_key,
-            model_name="llama3-8b-8192"
-        )
-        explanation = llm.invoke(prompt)
-        
-        return {
-            "status": "success", 
-            "message": "Explanation generated successfully", 
-            "explanation": explanation.content
-        }
+
+
+@app.post("/explain", summary="Get detailed explanation for a query")
+async def explain_endpoint(
+    body: QueryRequest,
+    keys: Settings = Depends(get_service_keys),
+    cache_bypass: bool = Depends(get_cache_bypass),
+):
+    """
+    Provide a detailed explanation for a user query using RAG (Retrieval-Augmented Generation).
+    """
+    try:
+        async with execution.admit():
+            print(f"Explaining query: {body.query}")
+            if cache_bypass:
+                answer_cache.record_bypass()
+            else:
+                explanation = await execution.run_io(answer_cache.lookup, "explain", body.url, body.level, body.query)
+                if explanation is not None:
+                    return {
+                        "status": "success",
+                        "message": "Explanation generated successfully",
+                        "explanation": explanation,
+                        "cached": True
+                    }
+
+            if body.url:
+                await ingestion.ensure_indexed(body.url, body.title)
+                schedule_summary_precompute(body.url, body.title, keys.groq_key)
+                    
+            # Retrieve relevant documents from Pinecone
+            context = await execution.run_io(retriever.get_context, body.query, body.url, 5)
+            
+            prompt = build_explain_prompt(body.query, context.text or "No relevant documents found.")
+            
+            # Use the pooled LLM client of the research agent to generate the explanation
+            research_agent = await execution.run_io(agent_pool.get, keys.groq_key)
+            explanation = await execution.run_io(research_agent.generate, prompt)
+            await execution.run_io(answer_cache.store, "explain", body.url, body.level, body.query, explanation)
+            
+            return {
+                "status": "success", 
+                "message": "Explanation generated successfully", 
+                "explanation": explanation,
+                "cached": False
+            }
+    except ExecutionOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         print(f"Error in explain endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """
+    Format one server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response releasing its execution admission once sent, even if the client
+    disconnected before the body was iterated and the event generator never started.
+    """
+
+    def __init__(self, content: AsyncIterator[str], release: Callable[[], None], **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
+def start_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Admit a streaming request and send its events, the admission is held until the stream ends.
+    """
+    try:
+        execution.acquire()
+    except ExecutionOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    released = False
+
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            execution.release()
+
+    async def admitted_events():
+        try:
+            async for event in events:
+                yield event
+        except Exception as e:
+            print(f"Error in stream: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            release()
+
+    try:
+        return AdmittedStreamingResponse(
+            admitted_events(),
+            release,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except Exception:
+        release()
+        raise
+
+
+async def query_events(body: QueryRequest, groq_key: str, cache_bypass: bool) -> AsyncIterator[str]:
+    if cache_bypass:
+        answer_cache.record_bypass()
+    else:
+        answer = await execution.run_io(answer_cache.lookup, "query", body.url, body.level, body.query)
+        if answer is not None:
+            yield sse_event("token", {"text": answer})
+            yield sse_event("done", {"answer": answer, "cached": True})
+            return
+
+    await ingestion.ensure_indexed(body.url, body.title)
+    yield sse_event("indexed", {"url": body.url})
+    schedule_summary_precompute(body.url, body.title, groq_key)
+
+    research_agent = await execution.run_io(agent_pool.get, groq_key)
+    answer, route = "", None
+    async for event, data in execution.stream_io(
+        research_agent.answer_question, body.query, body.url, body.title, body.level
+    ):
+        if event == "result":
+            answer, route = data
+        else:
+            yield sse_event(event, data)
+
+    if not answer.startswith("Error"):
+        await execution.run_io(answer_cache.store, "query", body.url, body.level, body.query, answer)
+    yield sse_event("done", {"answer": answer, "cached": False, "route": route})
+
+
+async def explain_events(body: QueryRequest, groq_key: str, cache_bypass: bool) -> AsyncIterator[str]:
+    if cache_bypass:
+        answer_cache.record_bypass()
+    else:
+        explanation = await execution.run_io(answer_cache.lookup, "explain", body.url, body.level, body.query)
+        if explanation is not None:
+            yield sse_event("token", {"text": explanation})
+            yield sse_event("done", {"explanation": explanation, "cached": True})
+            return
+
+    if body.url:
+        await ingestion.ensure_indexed(body.url, body.title)
+        yield sse_event("indexed", {"url": body.url})
+        schedule_summary_precompute(body.url, body.title, groq_key)
+
+    context = await execution.run_io(retriever.get_context, body.query, body.url, 5)
+    yield sse_event("retrieval", {"documents": len(context.chunks), "tokens": context.tokens})
+
+    research_agent = await execution.run_io(agent_pool.get, groq_key)
+    explanation = ""
+    prompt = build_explain_prompt(body.query, context.text or "No relevant documents found.")
+    async for event, data in execution.stream_io(research_agent.generate, prompt):
+        if event == "result":
+            explanation = data
+        else:
+            yield sse_event(event, data)
+
+    await execution.run_io(answer_cache.store, "explain", body.url, body.level, body.query, explanation)
+    yield sse_event("done", {"explanation": explanation, "cached": False})
+
+
+@app.post("/query/stream", summary="Run the AI agent against a user query, streaming the answer")
+async def query_stream_endpoint(
+    body: QueryRequest,
+    keys: Settings = Depends(get_service_keys),
+    cache_bypass: bool = Depends(get_cache_bypass),
+):
+    """
+    Stream the answer to a user query as server-sent events: "indexed", "route", "retrieval",
+    "tool" and "progress" events while it is being worked on, "token" events with the answer text
+    and a final "done" (or "error") event with the complete answer.
+    """
+    return start_stream(query_events(body, keys.groq_key, cache_bypass))
+
+@app.post("/explain/stream", summary="Get detailed explanation for a query, streaming the answer")
+async def explain_stream_endpoint(
+    body: QueryRequest,
+    keys: Settings = Depends(get_service_keys),
+    cache_bypass: bool = Depends(get_cache_bypass),
+):
+    """
+    Stream an explanation as server-sent events: "indexed" and "retrieval" events, "token" events
+    with the explanation text and a final "done" (or "error") event with the complete explanation.
+    """
+    return start_stream(explain_events(body, keys.groq_key, cache_bypass))
+
 # Entry point: run via Uvicorn on specified port
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
@@ -192,6 +756,6 @@ if __name__ == "__main__":
         "main:app",
         host=host,
         port=port,
-        reload=bool(os.getenv("RELOAD", True)),
+        reload=os.getenv("RELOAD", "true").lower() == "true",
         log_level="info"
     )
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+
+@dataclass
+class IndexManifest:
+    """
+    Chunks of a URL written to the vector store, by vector ID.
+    Each entry holds the content hash, chunkIndex and section the chunk was written with.
+    """
+    url: str
+    chunks: Dict[str, Dict] = field(default_factory=dict)
+    # False while an ingestion is running or after it was interrupted
+    complete: bool = False
+    # Hash of the ordered chunk IDs of the last complete ingestion
+    version: Optional[str] = None
+    updated_at: float = 0.0
+
+    def known_hashes(self) -> Set[str]:
+        return {entry["hash"] for entry in self.chunks.values()}
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "chunks": self.chunks,
+            "complete": self.complete,
+            "version": self.version,
+            "updated_at": self.updated_at,
+        }
+
+
+def manifest_version(ids: List[str]) -> str:
+    return hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()[:16]
+
+
+class ManifestStore:
+    """
+    Per-URL index manifests, one JSON file per URL, kept in memory only if no directory is given.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path (Optional[str]): Directory holding the manifest files
+        """
+        self.path = path
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+        self._manifests: Dict[str, IndexManifest] = {}
+        self._lock = threading.Lock()
+
+    def load(self, url: str) -> Optional[IndexManifest]:
+        with self._lock:
+            manifest = self._manifests.get(url)
+            if manifest is None and self.path:
+                manifest = self._read(url)
+                if manifest is not None:
+                    self._manifests[url] = manifest
+            return manifest
+
+    def save(self, manifest: IndexManifest) -> None:
+        with self._lock:
+            manifest.updated_at = time.time()
+            self._manifests[manifest.url] = manifest
+            if not self.path:
+                return
+            try:
+                file_path = self._file_path(manifest.url)
+                tmp_path = f"{file_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest.to_dict(), f, ensure_ascii=False)
+                os.replace(tmp_path, file_path)
+            except Exception as e:
+                print(f"Error saving index manifest of {manifest.url}: {str(e)}")
+
+    def delete(self, url: str) -> None:
+        with self._lock:
+            self._manifests.pop(url, None)
+            if self.path:
+                try:
+                    os.remove(self._file_path(url))
+                except FileNotFoundError:
+                    pass
+
+    def _file_path(self, url: str) -> str:
+        return os.path.join(self.path, f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json")
+
+    def _read(self, url: str) -> Optional[IndexManifest]:
+        try:
+            with open(self._file_path(url), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading index manifest of {url}: {str(e)}")
+            return None
+        return IndexManifest(
+            url=data["url"],
+            chunks=data.get("chunks", {}),
+            complete=data.get("complete", False),
+            version=data.get("version"),
+            updated_at=data.get("updated_at", 0.0),
+        )
@@ -0,0 +1,48 @@
+import json
+import re
+from typing import Dict, List
+
+from recommendation_cache import NO_RESULTS
+
+
+def _terms(text: str) -> set:
+    return {term for term in re.findall(r"[a-z0-9]+", text.lower()) if len(term) > 2}
+
+
+class OfflineArxivSearch:
+    """
+    Local stand-in for the arXiv search tool, for development and tests without network access.
+    Searches a JSON catalog of papers by term overlap with the title and formats the
+    results like the arXiv tool does.
+    """
+
+    def __init__(self, catalog_path: str, top_k: int = 3):
+        """
+        Args:
+            catalog_path (str): JSON file with a list of {"title", "authors", "summary", "published"} papers
+            top_k (int): Maximum number of papers returned per search
+        """
+        with open(catalog_path, 'r', encoding='utf-8') as f:
+            self.papers: List[Dict] = json.load(f)
+        self.top_k = top_k
+        self.calls = 0
+
+    def run(self, title: str) -> str:
+        self.calls += 1
+        query = _terms(title)
+        scored = []
+        for paper in self.papers:
+            overlap = len(query & _terms(f"{paper.get('title', '')} {paper.get('summary', '')}"))
+            if overlap:
+                scored.append((overlap, paper))
+        scored.sort(key=lambda item: -item[0])
+
+        if not scored:
+            return NO_RESULTS
+        return "\n\n".join(
+            f"Published: {paper.get('published', '')}\n"
+            f"Title: {paper.get('title', '')}\n"
+            f"Authors: {', '.join(paper.get('authors', [])) if isinstance(paper.get('authors'), list) else paper.get('authors', '')}\n"
+            f"Summary: {paper.get('summary', '')}"
+            for _, paper in scored[:self.top_k]
+        )
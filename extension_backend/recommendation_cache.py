@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from embedding_cache import normalize_query
+
+# Returned by the arXiv tool when a search finds nothing
+NO_RESULTS = "No good Arxiv Result was found"
+# Prefix of the arXiv tool's output when the search itself failed
+SEARCH_ERROR_PREFIX = "Arxiv exception"
+
+
+class RecommendationCache:
+    """
+    Cache of arXiv recommendations keyed by normalized paper title.
+    Results are kept for a long TTL, empty results for a shorter one, and concurrent
+    lookups of the same title share one arXiv search. Failed searches are not cached.
+    """
+
+    def __init__(
+        self,
+        search: Callable[[str], str],
+        ttl_seconds: float = 7 * 24 * 3600,
+        negative_ttl_seconds: float = 3600,
+        max_entries: int = 4096,
+        persist_path: Optional[str] = None,
+    ):
+        """
+        Initialize the cache, loading persisted entries if a path is given.
+
+        Args:
+            search (Callable[[str], str]): Search returning formatted results for a title, e.g. ArxivQueryRun().run
+            ttl_seconds (float): Seconds recommendations are kept
+            negative_ttl_seconds (float): Seconds an empty result is kept before the title is searched again
+            max_entries (int): Maximum number of titles kept, least recently used are evicted first
+            persist_path (Optional[str]): JSON file the cache is saved to so restarts keep recommendations
+        """
+        self.search = search
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        # Normalized title -> (result, created_at)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._search_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.searches = 0
+
+        if self.persist_path:
+            self._load()
+
+    def get(self, title: str) -> str:
+        """
+        Get the recommendations for a title, searching arXiv on a miss.
+        """
+        key = normalize_query(title)
+        with self._lock:
+            result = self._lookup(key)
+            if result is not None:
+                self.hits += 1
+                return result
+            self.misses += 1
+            search_lock = self._search_locks.setdefault(key, threading.Lock())
+
+        # One thread searches a title while concurrent callers wait for its result
+        with search_lock:
+            with self._lock:
+                result = self._lookup(key)
+            if result is None:
+                self.searches += 1
+                result = self.search(title)
+                if not result.startswith(SEARCH_ERROR_PREFIX):
+                    self._put(key, result)
+        with self._lock:
+            self._search_locks.pop(key, None)
+        return result
+
+    def prefetch(self, title: str) -> None:
+        """
+        Warm the cache for a title, e.g. right after its paper was indexed.
+        """
+        try:
+            self.get(title)
+        except Exception as e:
+            print(f"Error prefetching recommendations for '{title}': {str(e)}")
+
+    def invalidate(self, title: str) -> None:
+        with self._lock:
+            if self._entries.pop(normalize_query(title), None) is not None:
+                self._save()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "searches": self.searches}
+
+    def _lookup(self, key: str) -> Optional[str]:
+        # Called with the lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, created_at = entry
+        ttl = self.negative_ttl_seconds if result.startswith(NO_RESULTS) else self.ttl_seconds
+        if time.time() - created_at > ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _put(self, key: str, result: str) -> None:
+        with self._lock:
+            self._entries[key] = (result, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def _load(self) -> None:
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error loading recommendation cache: {str(e)}")
+            return
+
+        for key, (result, created_at) in sorted(entries.items(), key=lambda item: item[1][1]):
+            self._entries[key] = (result, created_at)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self) -> None:
+        # Called with the lock held
+        if not self.persist_path:
+            return
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(self._entries), f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            print(f"Error saving recommendation cache: {str(e)}")
@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from chunking import content_hash
+from embedding_cache import normalize_query
+
+
+class CrossEncoderReranker:
+    """
+    Reranks retrieved chunks with a cross-encoder scoring each (query, chunk) pair.
+    All uncached pairs of a query are scored in one batched pass, and scores are
+    cached by (normalized query, chunk content hash) so repeated questions skip the
+    model and a re-indexed chunk is never scored with the text it had before.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        device: str = "cpu",
+        batch_size: int = 32,
+        max_cache_entries: int = 50_000,
+    ):
+        """
+        Initialize the reranker, the model is loaded on first use.
+
+        Args:
+            model_name (str): Sentence-transformers cross-encoder model
+            device (str): Device the model runs on
+            batch_size (int): Pairs scored per forward pass
+            max_cache_entries (int): Maximum number of cached scores, least recently used are evicted first
+        """
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.max_cache_entries = max_cache_entries
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                self._model = CrossEncoder(self.model_name, device=self.device)
+            return self._model
+
+    def rerank(self, query: str, matches: List[Dict], top_n: int) -> List[Dict]:
+        """
+        Order matches by cross-encoder relevance and keep the best ones.
+
+        Args:
+            query (str): The search query
+            matches (List[Dict]): Candidate matches with their text in metadata "content"
+            top_n (int): Number of matches to keep
+
+        Returns:
+            List[Dict]: The top_n matches, best first, with their score in "rerank_score"
+        """
+        if not matches:
+            return []
+        normalized = normalize_query(query)
+        keys = [(normalized, self._content_key(match)) for match in matches]
+
+        scores: List = [None] * len(matches)
+        with self._lock:
+            for i, key in enumerate(keys):
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                    scores[i] = score
+            missing = [i for i, score in enumerate(scores) if score is None]
+            self.hits += len(matches) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            pairs = [(query, str((matches[i].get("metadata") or {}).get("content", ""))) for i in missing]
+            predicted = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            with self._lock:
+                for i, score in zip(missing, predicted):
+                    scores[i] = float(score)
+                    self._scores[keys[i]] = float(score)
+                while len(self._scores) > self.max_cache_entries:
+                    self._scores.popitem(last=False)
+
+        order = sorted(range(len(matches)), key=lambda i: -scores[i])
+        return [{**matches[i], "rerank_score": scores[i]} for i in order[:top_n]]
+
+    def _content_key(self, match: Dict) -> str:
+        metadata = match.get("metadata") or {}
+        return metadata.get("contentHash") or content_hash(str(metadata.get("content", "")))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"cached_scores": len(self._scores), "hits": self.hits, "misses": self.misses}
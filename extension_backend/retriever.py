@@ -1,27 +1,77 @@
-from pinecone import Pinecone
-from langchain.embeddings import HuggingFaceEmbeddings
 import os
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
+
+from index_cache import IndexedUrlCache
+from indexing import completion_marker_id
+from vector_store import VectorStore, PineconeVectorStore
+from shard_cache import PaperShardCache
+from lexical_index import LexicalIndexCache, reciprocal_rank_fusion
+from reranker import CrossEncoderReranker
+from context_builder import BuiltContext, ContextBuilder
 
 class PineconeRetriever:
     """
     A class for retrieving and reranking documents from a Pinecone vector database.
-    Implements semantic search with cross-encoder reranking.
+    Implements hybrid semantic and keyword search with optional cross-encoder reranking.
     """
 
-    def __init__(self, embeddings, index_name: str, k: int = 7):
+    def __init__(
+        self,
+        embeddings,
+        index_name: str,
+        k: int = 7,
+        indexed_cache: Optional[IndexedUrlCache] = None,
+        store: Optional[VectorStore] = None,
+        shard_cache: Optional[PaperShardCache] = None,
+        lexical_index: Optional[LexicalIndexCache] = None,
+        dense_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+        rrf_k: int = 60,
+        fusion_candidates: int = 20,
+        reranker: Optional[CrossEncoderReranker] = None,
+        rerank_candidates: int = 20,
+        rerank_top_k: Optional[int] = None,
+        context_builder: Optional[ContextBuilder] = None,
+    ):
         """
         Initialize the Pinecone retriever with enhanced query processing.
         
         Args:
             index_name (str): Name of the Pinecone index
             k (int): Number of documents to retrieve
+            indexed_cache (Optional[IndexedUrlCache]): Cache of indexed URLs checked before probing Pinecone
+            store (Optional[VectorStore]): Vector store to search, a Pinecone store on index_name if not given
+            shard_cache (Optional[PaperShardCache]): In-memory cache of hot papers searched before the vector store
+            lexical_index (Optional[LexicalIndexCache]): BM25 indexes fused with the dense results when given
+            dense_weight (float): Weight of the dense ranking in reciprocal rank fusion
+            lexical_weight (float): Weight of the BM25 ranking in reciprocal rank fusion
+            rrf_k (int): Rank offset of reciprocal rank fusion
+            fusion_candidates (int): Candidates taken from each ranking before fusion
+            reranker (Optional[CrossEncoderReranker]): Cross-encoder reordering the retrieved candidates when given
+            rerank_candidates (int): Candidates retrieved for the reranker
+            rerank_top_k (Optional[int]): Maximum number of chunks kept after reranking, k if not given
+            context_builder (Optional[ContextBuilder]): Assembles retrieved chunks into prompt context
         """
+        self.indexed_cache = indexed_cache
+        self.shard_cache = shard_cache
+        self.lexical_index = lexical_index
+        self.dense_weight = dense_weight
+        self.lexical_weight = lexical_weight
+        self.rrf_k = rrf_k
+        self.fusion_candidates = fusion_candidates
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.rerank_top_k = rerank_top_k
+        self.context_builder = context_builder or ContextBuilder()
         self.index_name = index_name
-        self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
-        self.pc = Pinecone(api_key=self.pinecone_api_key)
-        self.index = self.pc.Index(self.index_name)
+        if store is None:
+            from pinecone import Pinecone
+
+            self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
+            self.pc = Pinecone(api_key=self.pinecone_api_key)
+            store = PineconeVectorStore(self.pc.Index(self.index_name))
+        self.store = store
         self.k = k
 
         # Initialize embeddings model with better configuration
@@ -37,15 +87,15 @@ class PineconeRetriever:
         Returns:
             bool: True if file is indexed, False otherwise
         """
+        if self.indexed_cache is not None and self.indexed_cache.contains(url):
+            return True
+
         try:
-            query_response = self.index.query(
-                vector=[0] * 768,
-                filter={"url": url},
-                top_k=1,
-                include_metadata=True,
-                namespace='ns1'
-            )
-            return len(query_response.matches) > 0
+            # The Indexer writes a completion marker only after every chunk was upserted
+            is_indexed = len(self.store.fetch([completion_marker_id(url)])) > 0
+            if is_indexed and self.indexed_cache is not None:
+                self.indexed_cache.add(url)
+            return is_indexed
         except Exception as e:
             print(f"Error checking Pinecone index: {str(e)}")
             return False
@@ -55,12 +105,34 @@ class PineconeRetriever:
         Retrieve relevant documents from Pinecone based on the query.
         """
         try:
-            concatenated_text = self.get_relevant_documents(query, url, k)
-            return concatenated_text if concatenated_text else "No relevant documents found."
+            context = self.get_context(query, url, k)
+            return context.text if context else "No relevant documents found."
         except Exception as e:
             return f"Error retrieving documents: {str(e)}"
 
-    def get_relevant_documents(self, query: str, url: str, k: int) -> Tuple[List[str], str, List[str]]:
+    def get_context(self, query: str, url: str, k: int, max_tokens: Optional[int] = None) -> BuiltContext:
+        """
+        Retrieve the relevant chunks and assemble them into token-budgeted prompt context.
+        
+        Args:
+            query (str): Search query
+            url (str): URL of the paper
+            k (int): Maximum number of chunks
+            max_tokens (Optional[int]): Token budget overriding the context builder's default
+            
+        Returns:
+            BuiltContext: The context text and its token counts, empty if nothing was found or retrieval failed
+        """
+        try:
+            matches = self.search(query, url, k)
+        except Exception as e:
+            print(f"Error retrieving documents: {str(e)}")
+            matches = []
+        context = self.context_builder.build(matches, max_tokens)
+        print(f"Context for '{query}': {context.stats()}")
+        return context
+
+    def get_relevant_documents(self, query: str, url: str, k: int) -> List[str]:
         """
         Get relevant documents with enhanced error handling and logging.
         
@@ -69,23 +141,67 @@ class PineconeRetriever:
             url (Optional[str]): URL filter
             
         Returns:
-            Tuple[List[str], str, List[str]]: Formatted documents, concatenated text, and chunk IDs
+            List[str]: Formatted documents, empty if nothing was found or retrieval failed
         """
         try:
             print(f"Retrieving top {self.k} documents for query: '{query}'")
-            result = self.query_index(query, url, k)
+            matches = self.search(query, url, k)
             
-            if not result.get('matches'):
+            if not matches:
                 print("No relevant documents found")
-                return [], "", []
+                return []
                 
-            concatenated_text = self.format_docs(result['matches'])
+            concatenated_text = self.format_docs(matches)
             return concatenated_text
             
         except Exception as e:
             print(f"Error retrieving documents: {str(e)}")
-            return [], "", []
+            return []
+        
+    def search(self, query: str, url: str, k: int) -> List[Dict]:
+        """
+        Retrieve the best matches of the paper for a query.
+        With a reranker, more candidates are retrieved and the cross-encoder keeps the best ones.
         
+        Args:
+            query (str): Search query
+            url (str): URL of the paper
+            k (int): Maximum number of matches to return
+            
+        Returns:
+            List[Dict]: Matches, best first
+        """
+        if self.reranker is None:
+            return self.hybrid_search(query, url, k)
+
+        candidates = self.hybrid_search(query, url, max(k, self.rerank_candidates))
+        top_n = min(k, self.rerank_top_k) if self.rerank_top_k else k
+        return self.reranker.rerank(query, candidates, top_n)
+
+    def hybrid_search(self, query: str, url: str, k: int) -> List[Dict]:
+        """
+        Hybrid search: dense matches fused with BM25 matches of the paper by reciprocal rank fusion.
+        Falls back to the dense matches when no lexical index is available.
+        
+        Args:
+            query (str): Search query
+            url (str): URL of the paper
+            k (int): Number of matches to return
+            
+        Returns:
+            List[Dict]: Matches, best first
+        """
+        if self.lexical_index is None or not url:
+            return self.query_index(query, url, k).get('matches', [])
+
+        candidates = max(k, self.fusion_candidates)
+        dense = self.query_index(query, url, candidates).get('matches', [])
+        lexical = self.lexical_index.search(url, query, candidates, filter={"chunkIndex": {"$gte": 0}})
+        if not lexical:
+            return dense[:k]
+        fused = reciprocal_rank_fusion([dense, lexical], [self.dense_weight, self.lexical_weight], self.rrf_k)
+        return fused[:k]
+
     def clean_text(self, text: str) -> str:
         """
         Clean text by removing special characters and extra whitespace.
@@ -143,7 +259,7 @@ class PineconeRetriever:
         query_vector = self.embeddings.embed_query(query)
         return query_vector
 
-    def query_index(self, query: str, url: str, k: int) -> Dict:
+    def query_index(self, query: str, url: str, k: int, section: Optional[str] = None) -> Dict:
         """
         Enhanced query processing with better filtering and scoring.
         
@@ -151,6 +267,7 @@ class PineconeRetriever:
             query (str): Search query
             url (Optional[str]): URL filter
             k (int): Number of documents to retrieve
+            section (Optional[str]): Section filter, e.g. "3 Model Architecture > 3.2 Attention"
         Returns:
             Dict: Pinecone query response
         """
@@ -159,13 +276,22 @@ class PineconeRetriever:
         
         if url:
             filter_dict['url'] = url
+            # Only chunks carry a chunkIndex, which keeps the completion marker out of the results
+            filter_dict['chunkIndex'] = {"$gte": 0}
+        if section:
+            filter_dict['section'] = section
             
+        # Hot papers are searched in memory, cold ones go to the vector store
+        if url and self.shard_cache is not None:
+            response = self.shard_cache.search(url, vector, k, filter=filter_dict)
+            if response is not None:
+                return response
+
         # Enhanced query with better parameters
-        response = self.index.query(
-            namespace="ns1",
+        response = self.store.query(
             vector=vector,
             top_k=k,
-            include_values=True,
+            include_values=False,
             include_metadata=True,
             filter=filter_dict if filter_dict else None
         )
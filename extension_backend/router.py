@@ -0,0 +1,128 @@
+import re
+import threading
+from typing import Dict, List
+
+# Routes a question can take through ResearchAgent.answer_question
+ROUTE_SUMMARY = "summary"
+ROUTE_RECOMMEND = "recommend"
+ROUTE_DIRECT = "direct"
+ROUTE_AGENT = "agent"
+
+# Words hinting at a summary, enough to offer the agent its summary tool
+SUMMARY_KEYWORDS = [
+    "summarize", "summary", "summarise", "overview", "comprehensive report",
+    "give me a summary", "can you summarize", "what is this paper about",
+    "main points", "key findings", "conclusion", "synopsis",
+    "brief overview", "main ideas", "core concepts", "central themes"
+]
+
+_PAPER = r"(this|the) (paper|article|work|study|preprint)"
+# Requests for a summary of the whole paper, the only ones answered with the paper summary
+PAPER_SUMMARY_PATTERNS = [
+    re.compile(
+        r"\b(summari[sz]e|summary of|overview of|synopsis of|tl ?dr of|"
+        r"(main|key) (points|ideas|findings|contributions|takeaways) of) " + _PAPER + r"\b"
+    ),
+    re.compile(r"\bwhat (is|s) " + _PAPER + r" about\b"),
+    # A bare request, e.g. "Can you summarize?" or "Give me a summary please"
+    re.compile(
+        r"^ *((please|can|could|would|you|give|me|i|want|need|a|an|brief|short|quick) )*"
+        r"(summari[sz]e( it)?|summary|overview|synopsis|tl ?dr)( please)? *$"
+    ),
+]
+
+RECOMMEND_PATTERNS = [
+    re.compile(r"\b(recommend|suggest)\w* .*\b(papers?|articles?|reading|publications)\b"),
+    re.compile(r"\b(similar|related|other|relevant) (papers|work|works|articles|publications)\b"),
+    re.compile(r"\bpapers (like|similar to)\b"),
+    re.compile(r"\b(further reading|what should i read)\b"),
+]
+
+# Questions spanning several steps or sources are left to the agent
+AGENT_KEYWORDS = [
+    "compare", "comparison", "versus", "vs", "arxiv", "step by step", "and then"
+]
+
+
+def _normalize(text: str) -> str:
+    return f" {re.sub(r'[^a-z0-9 ]+', ' ', text.lower())} "
+
+
+def _contains_any(text: str, keywords: List[str]) -> bool:
+    return any(re.search(rf"\b{re.escape(keyword)}\b", text) for keyword in keywords)
+
+
+def _matches_any(text: str, patterns: List["re.Pattern"]) -> bool:
+    return any(pattern.search(text) for pattern in patterns)
+
+
+def mentions_summary(query: str) -> bool:
+    """
+    Whether a question contains a summary keyword as whole words, e.g. "key findings of the ablation".
+    """
+    return _contains_any(_normalize(query), SUMMARY_KEYWORDS)
+
+
+def is_paper_summary_request(query: str) -> bool:
+    """
+    Whether a question asks for a summary of the whole paper, e.g. "Summarize this paper".
+    """
+    return _matches_any(re.sub(r" +", " ", _normalize(query)), PAPER_SUMMARY_PATTERNS)
+
+
+class QueryRouter:
+    """
+    Keyword-based intent classifier picking the cheapest path that can answer a question.
+    Requests for a summary of the whole paper or for related papers go straight to their
+    tool. Other questions, including ones about a specific finding or conclusion, get
+    a single retrieval and generation, and only questions needing several tools or
+    steps go to the ReAct agent.
+    """
+
+    def route(self, query: str) -> str:
+        """
+        Classify a question.
+
+        Args:
+            query (str): The user's question
+
+        Returns:
+            str: One of ROUTE_SUMMARY, ROUTE_RECOMMEND, ROUTE_DIRECT or ROUTE_AGENT
+        """
+        text = _normalize(query)
+        wants_summary = is_paper_summary_request(query)
+        wants_recommendations = _matches_any(text, RECOMMEND_PATTERNS)
+
+        if (mentions_summary(query) and wants_recommendations) or _contains_any(text, AGENT_KEYWORDS):
+            return ROUTE_AGENT
+        if wants_summary:
+            return ROUTE_SUMMARY
+        if wants_recommendations:
+            return ROUTE_RECOMMEND
+        return ROUTE_DIRECT
+
+
+class RouteStats:
+    """
+    Thread-safe count and latency of the questions answered on each route.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._routes.setdefault(route, {"count": 0, "total_seconds": 0.0})
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                route: {
+                    "count": stats["count"],
+                    "mean_seconds": stats["total_seconds"] / stats["count"],
+                }
+                for route, stats in self._routes.items()
+            }
@@ -0,0 +1,178 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from vector_store import VectorStore, matches_filter
+
+
+@dataclass
+class PaperShard:
+    url: str
+    ids: List[str]
+    metadata: List[Dict]
+    # Row-normalized float32 matrix, one row per chunk
+    matrix: np.ndarray
+    nbytes: int
+
+
+class PaperShardCache:
+    """
+    In-memory cache of every chunk vector of hot papers.
+    On first access all chunks of a URL are pulled from the vector store into one
+    contiguous float32 matrix, later top-k searches are a single matrix-vector product.
+    Papers are evicted least recently used first when the memory budget is exceeded.
+    """
+
+    def __init__(self, store: VectorStore, max_bytes: int = 256 * 1024 * 1024, fetch_batch_size: int = 100):
+        """
+        Initialize the shard cache.
+
+        Args:
+            store (VectorStore): Vector store the chunks are loaded from
+            max_bytes (int): Memory budget for cached vectors and chunk metadata
+            fetch_batch_size (int): Number of IDs per fetch request when loading a paper
+        """
+        self.store = store
+        self.max_bytes = max_bytes
+        self.fetch_batch_size = fetch_batch_size
+        self._shards: "OrderedDict[str, PaperShard]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # Loads in progress by URL, and the generation invalidate() bumps while a URL loads
+        self._loading: Dict[str, int] = {}
+        self._generations: Dict[str, int] = {}
+        # Set when the store cannot list IDs (e.g. Pinecone pod indexes), disabling the cache
+        self._disabled = False
+        self.hits = 0
+        self.misses = 0
+
+    def search(self, url: str, vector: List[float], top_k: int, filter: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Search the chunks of one paper.
+
+        Args:
+            url (str): URL of the paper
+            vector (List[float]): Query vector
+            top_k (int): Number of matches to return
+            filter (Optional[Dict]): Metadata filter applied to the chunks
+
+        Returns:
+            Optional[Dict]: Matches shaped like a vector store response, or None if the paper could not be loaded
+        """
+        shard = self.get(url)
+        if shard is None or not shard.ids:
+            return None
+
+        query = np.asarray(vector, dtype=np.float32)
+        scores = shard.matrix @ (query / max(float(np.linalg.norm(query)), 1e-12))
+
+        matches = []
+        for i in np.argsort(-scores):
+            if matches_filter(shard.metadata[i], filter):
+                matches.append({"id": shard.ids[i], "score": float(scores[i]), "metadata": shard.metadata[i], "values": []})
+                if len(matches) >= top_k:
+                    break
+        return {"matches": matches}
+
+    def get(self, url: str) -> Optional[PaperShard]:
+        """
+        Get the shard of a paper, loading it from the vector store on first access.
+        """
+        with self._lock:
+            shard = self._shards.get(url)
+            if shard is not None:
+                self._shards.move_to_end(url)
+                self.hits += 1
+                return shard
+            if self._disabled:
+                return None
+            self.misses += 1
+            load_lock = self._load_locks.setdefault(url, threading.Lock())
+
+        # One thread loads a paper while concurrent callers wait for it
+        with load_lock:
+            with self._lock:
+                shard = self._shards.get(url)
+                if shard is None:
+                    self._loading[url] = self._loading.get(url, 0) + 1
+                    generation = self._generations.get(url, 0)
+            if shard is None:
+                try:
+                    shard = self._load(url)
+                finally:
+                    self._finish_load(url, generation, shard)
+        with self._lock:
+            self._load_locks.pop(url, None)
+        return shard
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            shard = self._shards.pop(url, None)
+            if shard is not None:
+                self._bytes -= shard.nbytes
+            # A load that started before the invalidation may have read the old chunks, keep it out of the cache
+            if url in self._loading:
+                self._generations[url] = self._generations.get(url, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"papers": len(self._shards), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def _load(self, url: str) -> Optional[PaperShard]:
+        try:
+            ids = self.store.list_ids(prefix=f"doc_{url}_")
+        except Exception as e:
+            if isinstance(e, NotImplementedError) or "not supported" in str(e).lower():
+                print(f"Shard cache disabled, vector store cannot list IDs: {str(e)}")
+                self._disabled = True
+            else:
+                print(f"Error listing chunks of {url}: {str(e)}")
+            return None
+
+        try:
+            vectors = {}
+            for i in range(0, len(ids), self.fetch_batch_size):
+                vectors.update(self.store.fetch(ids[i:i + self.fetch_batch_size]))
+        except Exception as e:
+            print(f"Error loading shard for {url}: {str(e)}")
+            return None
+
+        # Keep the chunks of this exact URL, leaving out the completion marker
+        chunks = [
+            vector for vector in vectors.values()
+            if vector["metadata"].get("url") == url and "chunkIndex" in vector["metadata"]
+        ]
+        if not chunks:
+            return None
+        chunks.sort(key=lambda vector: vector["metadata"]["chunkIndex"])
+
+        matrix = np.asarray([vector["values"] for vector in chunks], dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        metadata = [vector["metadata"] for vector in chunks]
+        nbytes = matrix.nbytes + sum(len(str(meta.get("content", ""))) for meta in metadata)
+        print(f"Loaded {len(chunks)} chunks of {url} into the shard cache")
+        return PaperShard(url=url, ids=[vector["id"] for vector in chunks], metadata=metadata, matrix=matrix, nbytes=nbytes)
+
+    def _finish_load(self, url: str, generation: int, shard: Optional[PaperShard]) -> None:
+        with self._lock:
+            stale = self._generations.get(url, 0) != generation
+            self._loading[url] -= 1
+            if not self._loading[url]:
+                del self._loading[url]
+                self._generations.pop(url, None)
+            if shard is not None and not stale:
+                self._add(shard)
+
+    def _add(self, shard: PaperShard) -> None:
+        # Called with the lock held
+        if shard.nbytes > self.max_bytes:
+            return
+        self._shards[shard.url] = shard
+        self._bytes += shard.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._shards.popitem(last=False)
+            self._bytes -= evicted.nbytes
@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Level of the structured summary every level variant is rewritten from
+DEFAULT_SUMMARY_LEVEL = "default"
+
+
+class SummaryStore:
+    """
+    Persistent store of precomputed paper summaries, keyed by URL and reader level.
+    Summaries are generated once per paper after indexing and served to later
+    summary requests instead of re-running the retrieval and LLM calls.
+    """
+
+    def __init__(self, persist_path: Optional[str] = None, ttl_seconds: float = 30 * 24 * 3600):
+        """
+        Initialize the store, loading persisted summaries if a path is given.
+
+        Args:
+            persist_path (Optional[str]): JSON file the summaries are saved to, kept in memory only if not given
+            ttl_seconds (float): Seconds after which a summary is regenerated
+        """
+        self.persist_path = persist_path
+        self.ttl_seconds = ttl_seconds
+        # URL -> level -> {"summary", "created_at"}
+        self._entries: Dict[str, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.persist_path:
+            self._load()
+
+    def get(self, url: str, level: Optional[str] = None) -> Optional[str]:
+        """
+        Get the summary of a paper for a level, falling back to the default summary.
+        """
+        with self._lock:
+            levels = self._entries.get(url, {})
+            for candidate in (level, DEFAULT_SUMMARY_LEVEL):
+                entry = levels.get(candidate) if candidate else None
+                if entry is not None and time.time() - entry["created_at"] <= self.ttl_seconds:
+                    self.hits += 1
+                    return entry["summary"]
+            self.misses += 1
+            return None
+
+    def has(self, url: str, levels: List[str]) -> bool:
+        """
+        Check if unexpired summaries exist for every given level of a paper, without counting a hit or miss.
+        """
+        with self._lock:
+            entries = self._entries.get(url, {})
+            now = time.time()
+            return all(
+                level in entries and now - entries[level]["created_at"] <= self.ttl_seconds
+                for level in levels
+            )
+
+    def put(self, url: str, summary: str, level: str = DEFAULT_SUMMARY_LEVEL) -> None:
+        with self._lock:
+            self._entries.setdefault(url, {})[level] = {"summary": summary, "created_at": time.time()}
+            self._save()
+
+    def invalidate(self, url: str) -> None:
+        """
+        Remove every summary of a paper, e.g. after it was re-indexed.
+        """
+        with self._lock:
+            if self._entries.pop(url, None) is not None:
+                self._save()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "papers": len(self._entries),
+                "summaries": sum(len(levels) for levels in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _load(self) -> None:
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error loading summary store: {str(e)}")
+            return
+
+        now = time.time()
+        for url, levels in entries.items():
+            fresh = {
+                level: entry for level, entry in levels.items()
+                if now - entry.get("created_at", 0) <= self.ttl_seconds
+            }
+            if fresh:
+                self._entries[url] = fresh
+
+    def _save(self) -> None:
+        # Called with the lock held
+        if not self.persist_path:
+            return
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            print(f"Error saving summary store: {str(e)}")
@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shard_cache import PaperShardCache  # noqa: E402
+from vector_store import VectorStore  # noqa: E402
+
+URL = "https://arxiv.org/html/1706.03762v7"
+
+
+class BlockingVectorStore(VectorStore):
+    """
+    Vector store whose fetch waits until released, so an invalidation can land mid-load.
+    """
+
+    def __init__(self, contents: List[str]):
+        self.contents = contents
+        self.fetching = threading.Event()
+        self.release = threading.Event()
+
+    def list_ids(self, prefix: str) -> List[str]:
+        return [f"doc_{URL}_{i}" for i in range(len(self.contents))]
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict]:
+        self.fetching.set()
+        self.release.wait(timeout=5)
+        return {
+            id: {"id": id, "values": [1.0, float(i)], "metadata": {"url": URL, "chunkIndex": i, "content": content}}
+            for i, (id, content) in enumerate(zip(ids, self.contents))
+        }
+
+
+def test_invalidate_during_load_does_not_cache_stale_shard():
+    store = BlockingVectorStore(["old chunk"])
+    cache = PaperShardCache(store)
+    loader = threading.Thread(target=cache.get, args=(URL,))
+    loader.start()
+    assert store.fetching.wait(timeout=5)
+
+    # The paper is re-indexed while the load is still reading the old chunks
+    cache.invalidate(URL)
+    store.release.set()
+    loader.join(timeout=5)
+    assert cache.stats()["papers"] == 0
+
+    store.contents = ["new chunk"]
+    shard = cache.get(URL)
+    assert [meta["content"] for meta in shard.metadata] == ["new chunk"]
+    assert cache.stats()["papers"] == 1
+
+
+def test_load_without_invalidation_is_cached():
+    store = BlockingVectorStore(["chunk"])
+    store.release.set()
+    cache = PaperShardCache(store)
+
+    assert cache.get(URL) is cache.get(URL)
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,320 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class VectorStore:
+    """
+    Interface of the vector stores used by the Indexer and the retriever.
+    Results are plain dicts shaped like Pinecone responses:
+    matches are {"id", "score", "metadata", "values"} dicts.
+    """
+
+    def upsert(self, vectors: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def query(self, vector: List[float], top_k: int, filter: Optional[Dict] = None,
+              include_values: bool = False, include_metadata: bool = True) -> Dict:
+        raise NotImplementedError
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict]:
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]) -> None:
+        raise NotImplementedError
+
+    def update_metadata(self, updates: Dict[str, Dict]) -> None:
+        """
+        Merge new metadata into existing vectors, by vector ID, without rewriting their values.
+        """
+        raise NotImplementedError
+
+    def list_ids(self, prefix: str) -> List[str]:
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    """
+    Vector store backed by a hosted Pinecone index.
+    """
+
+    def __init__(self, index=None, namespace: str = "ns1", index_factory: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            index: Pinecone Index handle
+            namespace (str): Namespace all vectors are written to and read from
+            index_factory (Optional[Callable[[], Any]]): Builds the Index handle on first use instead of index,
+                so resolving the index host does not slow down startup
+        """
+        if index is None and index_factory is None:
+            raise ValueError("Either index or index_factory is required")
+        self._index = index
+        self._index_factory = index_factory
+        self._index_lock = threading.Lock()
+        self.namespace = namespace
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = self._index_factory()
+        return self._index
+
+    def upsert(self, vectors: List[Dict]) -> None:
+        self.index.upsert(vectors=vectors, namespace=self.namespace)
+
+    def query(self, vector: List[float], top_k: int, filter: Optional[Dict] = None,
+              include_values: bool = False, include_metadata: bool = True) -> Dict:
+        response = self.index.query(
+            namespace=self.namespace,
+            vector=vector,
+            top_k=top_k,
+            include_values=include_values,
+            include_metadata=include_metadata,
+            filter=filter
+        )
+        return {
+            "matches": [
+                {"id": match.id, "score": match.score, "metadata": match.metadata or {}, "values": match.values or []}
+                for match in response.matches
+            ]
+        }
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict]:
+        response = self.index.fetch(ids=ids, namespace=self.namespace)
+        return {
+            vector_id: {"id": vector_id, "values": vector.values, "metadata": vector.metadata or {}}
+            for vector_id, vector in response.vectors.items()
+        }
+
+    def delete(self, ids: List[str]) -> None:
+        self.index.delete(ids=ids, namespace=self.namespace)
+
+    def update_metadata(self, updates: Dict[str, Dict]) -> None:
+        # Pinecone updates one vector per request
+        for vector_id, metadata in updates.items():
+            self.index.update(id=vector_id, set_metadata=metadata, namespace=self.namespace)
+
+    def list_ids(self, prefix: str) -> List[str]:
+        # Listing by prefix is only supported by serverless indexes
+        ids = []
+        for page in self.index.list(prefix=prefix, namespace=self.namespace):
+            ids.extend(page)
+        return ids
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict]) -> bool:
+    """
+    Evaluate the subset of Pinecone metadata filters used by the backend:
+    equality, $eq, $ne, $gt, $gte, $lt, $lte, $in and $nin on top-level fields.
+    """
+    for field, condition in (filter or {}).items():
+        value = metadata.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator == "$eq" and value != operand:
+                return False
+            if operator == "$ne" and value == operand:
+                return False
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$nin" and value in operand:
+                return False
+            if operator in ("$gt", "$gte", "$lt", "$lte"):
+                if not isinstance(value, (int, float)):
+                    return False
+                if operator == "$gt" and not value > operand:
+                    return False
+                if operator == "$gte" and not value >= operand:
+                    return False
+                if operator == "$lt" and not value < operand:
+                    return False
+                if operator == "$lte" and not value <= operand:
+                    return False
+    return True
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Offline vector store with one shard per paper URL.
+    Each shard is a memory-mapped float32 numpy matrix with a JSON metadata sidecar,
+    searched by cosine similarity.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Directory holding the shards
+        """
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.RLock()
+        # Shard key -> (ids, metadata, normalized vectors)
+        self._shards: Dict[str, tuple] = {}
+        self._id_to_shard: Optional[Dict[str, str]] = None
+
+    def upsert(self, vectors: List[Dict]) -> None:
+        by_shard: Dict[str, List[Dict]] = {}
+        for vector in vectors:
+            by_shard.setdefault(self._shard_key(vector["metadata"].get("url", "")), []).append(vector)
+
+        with self._lock:
+            id_map = self._id_map()
+            for key, shard_vectors in by_shard.items():
+                ids, metadata, values = self._load_shard(key)
+                rows = {vector_id: i for i, vector_id in enumerate(ids)}
+                ids, metadata = list(ids), list(metadata)
+                values = [row for row in values]
+                for vector in shard_vectors:
+                    row = np.asarray(vector["values"], dtype=np.float32)
+                    if vector["id"] in rows:
+                        i = rows[vector["id"]]
+                        metadata[i], values[i] = vector["metadata"], row
+                    else:
+                        rows[vector["id"]] = len(ids)
+                        ids.append(vector["id"])
+                        metadata.append(vector["metadata"])
+                        values.append(row)
+                    id_map[vector["id"]] = key
+                self._save_shard(key, ids, metadata, np.vstack(values))
+
+    def query(self, vector: List[float], top_k: int, filter: Optional[Dict] = None,
+              include_values: bool = False, include_metadata: bool = True) -> Dict:
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        url = (filter or {}).get("url")
+        with self._lock:
+            if isinstance(url, str):
+                keys = [self._shard_key(url)]
+            else:
+                keys = [name for name in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, name))]
+            shards = [self._load_shard(key) for key in keys]
+
+        candidates = []
+        for ids, metadata, values in shards:
+            if not ids:
+                continue
+            scores = values @ query
+            taken = 0
+            for i in np.argsort(-scores):
+                if matches_filter(metadata[i], filter):
+                    candidates.append((float(scores[i]), ids[i], metadata[i], values[i]))
+                    taken += 1
+                    if taken >= top_k:
+                        break
+
+        candidates.sort(key=lambda candidate: -candidate[0])
+        return {
+            "matches": [
+                {
+                    "id": vector_id,
+                    "score": score,
+                    "metadata": meta if include_metadata else {},
+                    "values": row.tolist() if include_values else [],
+                }
+                for score, vector_id, meta, row in candidates[:top_k]
+            ]
+        }
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict]:
+        result = {}
+        with self._lock:
+            id_map = self._id_map()
+            for vector_id in ids:
+                key = id_map.get(vector_id)
+                if key is None:
+                    continue
+                shard_ids, metadata, values = self._load_shard(key)
+                if vector_id in shard_ids:
+                    i = shard_ids.index(vector_id)
+                    result[vector_id] = {"id": vector_id, "values": values[i].tolist(), "metadata": metadata[i]}
+        return result
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            id_map = self._id_map()
+            by_shard: Dict[str, set] = {}
+            for vector_id in ids:
+                key = id_map.pop(vector_id, None)
+                if key is not None:
+                    by_shard.setdefault(key, set()).add(vector_id)
+            for key, removed in by_shard.items():
+                shard_ids, metadata, values = self._load_shard(key)
+                keep = [i for i, vector_id in enumerate(shard_ids) if vector_id not in removed]
+                self._save_shard(
+                    key,
+                    [shard_ids[i] for i in keep],
+                    [metadata[i] for i in keep],
+                    values[keep] if keep else np.zeros((0, values.shape[1] if values.ndim == 2 else 0), dtype=np.float32),
+                )
+
+    def update_metadata(self, updates: Dict[str, Dict]) -> None:
+        with self._lock:
+            id_map = self._id_map()
+            by_shard: Dict[str, Dict[str, Dict]] = {}
+            for vector_id, metadata in updates.items():
+                key = id_map.get(vector_id)
+                if key is None:
+                    raise KeyError(f"Unknown vector ID: {vector_id}")
+                by_shard.setdefault(key, {})[vector_id] = metadata
+            for key, shard_updates in by_shard.items():
+                ids, metadata, values = self._load_shard(key)
+                metadata = [
+                    {**meta, **shard_updates[vector_id]} if vector_id in shard_updates else meta
+                    for vector_id, meta in zip(ids, metadata)
+                ]
+                self._save_shard(key, ids, metadata, np.asarray(values))
+
+    def list_ids(self, prefix: str) -> List[str]:
+        with self._lock:
+            return [vector_id for vector_id in self._id_map() if vector_id.startswith(prefix)]
+
+    def _shard_key(self, url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _id_map(self) -> Dict[str, str]:
+        # Built lazily from the shard sidecars, called with the lock held
+        if self._id_to_shard is None:
+            self._id_to_shard = {}
+            for key in os.listdir(self.path):
+                if os.path.isdir(os.path.join(self.path, key)):
+                    for vector_id in self._load_shard(key)[0]:
+                        self._id_to_shard[vector_id] = key
+        return self._id_to_shard
+
+    def _load_shard(self, key: str) -> tuple:
+        if key in self._shards:
+            return self._shards[key]
+        shard_dir = os.path.join(self.path, key)
+        try:
+            with open(os.path.join(shard_dir, "metadata.json"), "r", encoding="utf-8") as f:
+                sidecar = json.load(f)
+            values = np.load(os.path.join(shard_dir, "vectors.npy"), mmap_mode="r")
+            shard = (sidecar["ids"], sidecar["metadata"], values)
+        except FileNotFoundError:
+            shard = ([], [], np.zeros((0, 0), dtype=np.float32))
+        self._shards[key] = shard
+        return shard
+
+    def _save_shard(self, key: str, ids: List[str], metadata: List[Dict], values: np.ndarray) -> None:
+        shard_dir = os.path.join(self.path, key)
+        os.makedirs(shard_dir, exist_ok=True)
+        norms = np.linalg.norm(values, axis=1, keepdims=True) if len(values) else 1.0
+        values = (values / np.maximum(norms, 1e-12)).astype(np.float32)
+
+        # Write to temporary files first so a crash never leaves a half-written shard
+        np.save(os.path.join(shard_dir, "vectors.tmp.npy"), values)
+        with open(os.path.join(shard_dir, "metadata.tmp.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "metadata": metadata}, f, ensure_ascii=False)
+        os.replace(os.path.join(shard_dir, "vectors.tmp.npy"), os.path.join(shard_dir, "vectors.npy"))
+        os.replace(os.path.join(shard_dir, "metadata.tmp.json"), os.path.join(shard_dir, "metadata.json"))
+
+        self._shards.pop(key, None)
+        self._load_shard(key)